@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import joblib
+from career_progression_analysis import (BASE_CLUSTER_FEATURES, CLUSTER_DERIVED_FEATURES, DEFAULT_RISK_LEVEL,
+                                         DERIVED_FEATURE_SPECS, DERIVED_FEATURES, ENCODED_CATEGORICAL_COLUMNS,
+                                         RISK_LEVEL_CUTOFFS, RISK_SCORING_CRITERIA, CareerProgressionAnalyzer)
+
+# Bump when the on-disk layout changes so old entries stop matching
+CACHE_FORMAT_VERSION = 2
+
+# Analyzer state persisted by the cache, grouped by storage format
+CACHED_FRAMES = ['processed_df', 'retention_opportunities']
+CACHED_ARRAYS = ['X_scaled', 'clusters']
+CACHED_OBJECTS = ['scaler', 'le_dict', 'kmeans_model', 'feature_names',
+                  'cluster_analysis', 'cluster_labels', 'peer_index']
+
+def fingerprint_file(path, block_size=1 << 20):
+    """Hash a file's contents without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_columnar_frame(df, directory):
+    """Write a DataFrame as one .npy file per column plus a JSON manifest"""
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+
+    for i, (name, series) in enumerate(df.items()):
+        entry = {'name': name, 'file': f'col_{i}.npy'}
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Categoricals keep their codes on disk and categories in the manifest
+            entry['kind'] = 'category'
+            entry['categories'] = series.cat.categories.tolist()
+            entry['ordered'] = bool(series.cat.ordered)
+            values = series.cat.codes.to_numpy()
+        elif series.dtype == object:
+            # Strings are dictionary-encoded so the codes can be memory-mapped
+            entry['kind'] = 'object'
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            entry['categories'] = uniques.tolist()
+            values = codes
+        else:
+            entry['kind'] = 'numeric'
+            values = series.to_numpy()
+
+        np.save(os.path.join(directory, entry['file']), values, allow_pickle=False)
+        columns.append(entry)
+
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        index_entry = {'kind': 'range', 'start': index.start, 'stop': index.stop, 'step': index.step}
+    else:
+        index_entry = {'kind': 'array', 'file': 'index.npy'}
+        np.save(os.path.join(directory, 'index.npy'), index.to_numpy(), allow_pickle=False)
+
+    with open(os.path.join(directory, 'frame.json'), 'w') as f:
+        json.dump({'columns': columns, 'index': index_entry, 'length': len(df)}, f)
+
+def read_columnar_frame(directory, mmap_mode='r', columns=None):
+    """Load a frame written by write_columnar_frame, memory-mapping numeric columns
+
+    columns limits the load to those columns; the others are never opened.
+    """
+    with open(os.path.join(directory, 'frame.json')) as f:
+        manifest = json.load(f)
+    entries = manifest['columns']
+    if columns is not None:
+        by_name = {entry['name']: entry for entry in entries}
+        entries = [by_name[name] for name in columns]
+
+    data = {}
+    for entry in entries:
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode=mmap_mode)
+
+        if entry['kind'] == 'category':
+            data[entry['name']] = pd.Categorical.from_codes(
+                values, categories=entry['categories'], ordered=entry['ordered'])
+        elif entry['kind'] == 'object':
+            # Code -1 marks a missing value; it indexes the trailing NaN slot
+            lookup = np.array(entry['categories'] + [np.nan], dtype=object)
+            data[entry['name']] = lookup[values]
+        else:
+            data[entry['name']] = values
+
+    index_entry = manifest['index']
+    if index_entry['kind'] == 'range':
+        index = pd.RangeIndex(index_entry['start'], index_entry['stop'], index_entry['step'])
+    else:
+        index = pd.Index(np.load(os.path.join(directory, index_entry['file'])))
+
+    return pd.DataFrame(data, index=index, columns=[c['name'] for c in entries], copy=False)
+
+def _directory_size(path):
+    """Total size in bytes of the files below a directory"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def pipeline_definitions():
+    """Code-level definitions that decide the cached scores and clusters, as read right now"""
+    # Read at call time: derived and cluster features can be registered at runtime
+    return {
+        'risk_scoring_criteria': RISK_SCORING_CRITERIA,
+        'risk_level_cutoffs': RISK_LEVEL_CUTOFFS,
+        'default_risk_level': DEFAULT_RISK_LEVEL,
+        'derived_feature_specs': DERIVED_FEATURE_SPECS,
+        'derived_features': DERIVED_FEATURES,
+        'cluster_features': BASE_CLUSTER_FEATURES + CLUSTER_DERIVED_FEATURES,
+        'encoded_categorical_columns': ENCODED_CATEGORICAL_COLUMNS,
+    }
+
+class AnalysisCache:
+    def __init__(self, cache_dir='.analysis_cache', max_bytes=2 * 1024 ** 3):
+        """Initialize an on-disk cache of fitted analyzer state"""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, data_path, config):
+        """Build the cache key from the input file contents, pipeline configuration and definitions"""
+        digest = hashlib.sha256()
+        digest.update(fingerprint_file(data_path).encode())
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+        digest.update(json.dumps(pipeline_definitions(), sort_keys=True, default=str).encode())
+        digest.update(str(CACHE_FORMAT_VERSION).encode())
+        return digest.hexdigest()[:32]
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def store(self, key, analyzer):
+        """Persist an analyzer's fitted state under the given key"""
+        # Write into a scratch directory and rename it into place so readers
+        # never see a half-written entry
+        staging = os.path.join(self.cache_dir, f'.tmp-{uuid.uuid4().hex}')
+        os.makedirs(staging)
+
+        try:
+            for name in CACHED_FRAMES:
+                frame = getattr(analyzer, name, None)
+                if frame is not None:
+                    write_columnar_frame(frame, os.path.join(staging, name))
+
+            for name in CACHED_ARRAYS:
+                array = getattr(analyzer, name, None)
+                if array is not None:
+                    np.save(os.path.join(staging, f'{name}.npy'), np.asarray(array), allow_pickle=False)
+
+            objects = {name: getattr(analyzer, name, None) for name in CACHED_OBJECTS}
+            joblib.dump(objects, os.path.join(staging, 'models.joblib'))
+
+            with open(os.path.join(staging, 'entry.json'), 'w') as f:
+                json.dump({'key': key, 'data_path': analyzer.data_path,
+                           'format_version': CACHE_FORMAT_VERSION, 'created': time.time()}, f)
+
+            target = self._entry_path(key)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(staging, target)
+        finally:
+            if os.path.exists(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+
+        self.evict()
+
+    def load(self, key):
+        """Restore a cached analyzer, or return None on a cache miss"""
+        path = self._entry_path(key)
+        if not os.path.exists(os.path.join(path, 'entry.json')):
+            return None
+
+        with open(os.path.join(path, 'entry.json')) as f:
+            entry = json.load(f)
+        if entry.get('format_version') != CACHE_FORMAT_VERSION:
+            self.invalidate(key)
+            return None
+
+        analyzer = CareerProgressionAnalyzer(entry['data_path'])
+
+        for name in CACHED_FRAMES:
+            if os.path.exists(os.path.join(path, name)):
+                setattr(analyzer, name, read_columnar_frame(os.path.join(path, name)))
+
+        for name in CACHED_ARRAYS:
+            if os.path.exists(os.path.join(path, f'{name}.npy')):
+                setattr(analyzer, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+        for name, value in joblib.load(os.path.join(path, 'models.joblib')).items():
+            if value is not None:
+                setattr(analyzer, name, value)
+
+        # Touch the entry so eviction treats it as recently used
+        os.utime(os.path.join(path, 'entry.json'))
+        return analyzer
+
+    def invalidate(self, key=None):
+        """Drop one cache entry, or every entry when no key is given"""
+        keys = [key] if key is not None else self.keys()
+        for k in keys:
+            shutil.rmtree(self._entry_path(k), ignore_errors=True)
+
+    def keys(self):
+        """List the keys of complete cache entries"""
+        return [name for name in os.listdir(self.cache_dir)
+                if os.path.exists(os.path.join(self.cache_dir, name, 'entry.json'))]
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for key in self.keys():
+            path = self._entry_path(key)
+            last_used = os.path.getmtime(os.path.join(path, 'entry.json'))
+            entries.append((last_used, key, _directory_size(path)))
+
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.invalidate(key)
+            total -= size
@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from career_progression_analysis import CareerProgressionAnalyzer
+from pipeline_instrumentation import JsonLinesSink, StageProfiler
+
+# Thread-count variables read by OpenBLAS, MKL, Accelerate and OpenMP when they load
+BLAS_THREAD_VARIABLES = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                         'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+SUMMARY_COLUMNS = ['name', 'data_path', 'status', 'attempts', 'employees', 'n_clusters', 'silhouette',
+                   'attrition_rate', 'high_risk', 'retention_opportunities', 'wall_time_s',
+                   'output_dir', 'error']
+
+# Keeps the worker's thread limits alive for the life of the process
+_thread_limits = None
+
+# Shared flags a worker sets as it starts each job of the current pool
+_started = None
+
+def read_manifest(path):
+    """Read a CSV manifest with a data_path column and optional name / n_clusters columns"""
+    manifest = pd.read_csv(path)
+    if 'data_path' not in manifest.columns:
+        raise ValueError("Manifest needs a data_path column")
+
+    # Relative paths are resolved against the manifest's own directory
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    seen = {}
+    for row in manifest.to_dict('records'):
+        data_path = os.path.join(base, row['data_path'])
+        name = row.get('name')
+        if not isinstance(name, str) or not name:
+            name = os.path.splitext(os.path.basename(data_path))[0]
+        # Repeated names get a suffix so every dataset keeps its own output directory
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}_{seen[name]}"
+        n_clusters = row.get('n_clusters')
+        jobs.append({'name': name, 'data_path': data_path,
+                     'n_clusters': None if pd.isna(n_clusters) else int(n_clusters)})
+    return jobs
+
+def pin_worker_threads(threads):
+    """Cap BLAS/OpenMP pools in a worker so parallel datasets do not oversubscribe cores"""
+    global _thread_limits
+    # Libraries loaded later (sklearn's OpenMP runtime) read the environment
+    for variable in BLAS_THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    # Libraries already loaded (numpy's BLAS) are limited at runtime
+    from threadpoolctl import threadpool_limits
+    _thread_limits = threadpool_limits(limits=threads)
+
+def _init_worker(threads, started):
+    """Pool initializer: pin BLAS threads and keep the pool's started-job flags"""
+    global _started
+    _started = started
+    pin_worker_threads(threads)
+
+def _run_tracked(index, job, output_root, **pipeline_kwargs):
+    """Flag job index as started, then run it; shared memory survives a crash right after"""
+    _started[index] = 1
+    return run_dataset(job, output_root, **pipeline_kwargs)
+
+def run_dataset(job, output_root, n_clusters=None, max_clusters=6, clustering='kmeans', typed=False,
+                compact=False):
+    """Run the full analyzer pipeline for one dataset and return its summary record"""
+    start = time.perf_counter()
+    output_dir = os.path.join(output_root, job['name'])
+    os.makedirs(output_dir, exist_ok=True)
+    n_clusters = job.get('n_clusters') or n_clusters
+
+    profiler = StageProfiler(sinks=[JsonLinesSink(os.path.join(output_dir, 'pipeline_events.jsonl'))])
+    analyzer = CareerProgressionAnalyzer(job['data_path'], profiler=profiler, compact=compact)
+
+    # Each dataset's progress output goes to its own log instead of the shared console
+    with open(os.path.join(output_dir, 'analysis.log'), 'w') as log, contextlib.redirect_stdout(log):
+        analyzer.load_data(typed=typed)
+        analyzer.feature_engineering()
+        analyzer.preprocess_data()
+        if n_clusters is None:
+            # The pool already uses every core; the k-sweep runs serially inside the worker
+            n_clusters = analyzer.find_optimal_clusters(max_clusters=max_clusters, n_jobs=1,
+                                                        silhouette_method='sampled', plot=False)
+        analyzer.perform_clustering(n_clusters, method=clustering, silhouette_method='sampled')
+        analyzer.interpret_clusters()
+        analyzer.calculate_promotion_gap_risk_score()
+        analyzer.identify_retention_opportunities()
+        insights = analyzer.generate_insights()
+        for i, insight in enumerate(insights, 1):
+            print(f"{i}. {insight}")
+        analyzer.save_results(output_dir)
+
+    df = analyzer.processed_df
+    return {
+        'name': job['name'],
+        'data_path': job['data_path'],
+        'status': 'ok',
+        'employees': len(df),
+        'n_clusters': int(n_clusters),
+        'silhouette': float(analyzer.silhouette_avg),
+        'attrition_rate': float(df['Attrition'].mean()),
+        'high_risk': int((df['PromotionGapRiskLevel'] == 'High').sum()),
+        'retention_opportunities': len(analyzer.retention_opportunities),
+        'wall_time_s': time.perf_counter() - start,
+        'output_dir': output_dir,
+        'error': None,
+    }
+
+def _failure(job, error):
+    """Summary record for a dataset whose last attempt raised"""
+    return {'name': job['name'], 'data_path': job['data_path'], 'status': 'failed',
+            'error': f"{type(error).__name__}: {error}"}
+
+def run_batch(jobs, output_root, workers=None, retries=1, blas_threads=None, **pipeline_kwargs):
+    """Run every manifest job across a process pool; returns the consolidated summary frame
+
+    A dataset that raises is retried in a later round until it has used
+    1 + retries attempts. A worker crash breaks the pool and fails every
+    job still in it, so those jobs are not charged an attempt. The jobs
+    that were running when it broke (at most one per worker) rerun next,
+    all at once but each in a one-worker pool of its own. A crash there can
+    only be its own and is charged. Jobs that had not started then go
+    back to a full-width shared pool.
+    """
+    cpus = os.cpu_count() or 1
+    workers = min(workers or cpus, max(len(jobs), 1))
+    blas_threads = blas_threads or max(1, cpus // workers)
+    os.makedirs(output_root, exist_ok=True)
+
+    attempts = {job['name']: 0 for job in jobs}
+    records = {}
+    shared = list(jobs)
+    # Jobs that may have crashed a worker, waiting for a pool of their own
+    isolated = []
+    # spawn gives every worker a clean interpreter on all platforms
+    context = multiprocessing.get_context('spawn')
+    while shared or isolated:
+        # Suspects go first, up to `workers` at once, each in a one-worker pool
+        if isolated:
+            batch, isolated = isolated[:workers], isolated[workers:]
+            pool_sizes = [1] * len(batch)
+        else:
+            batch, shared = shared, []
+            pool_sizes = [min(workers, len(batch))]
+        started = context.Array('b', len(batch), lock=False)
+        broken = []
+        with contextlib.ExitStack() as stack:
+            pools = [stack.enter_context(ProcessPoolExecutor(max_workers=size, mp_context=context,
+                                                             initializer=_init_worker,
+                                                             initargs=(blas_threads, started)))
+                     for size in pool_sizes]
+            futures = {pools[i % len(pools)].submit(_run_tracked, i, job, output_root, **pipeline_kwargs): job
+                       for i, job in enumerate(batch)}
+            # A crash is only attributable to a job that had its pool to itself
+            attributable = len(batch) == 1 or len(pools) > 1
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    record = future.result()
+                except Exception as error:
+                    crashed = isinstance(error, BrokenProcessPool)
+                    if crashed and not attributable:
+                        broken.append(job)
+                        continue
+                    attempts[job['name']] += 1
+                    if attempts[job['name']] > retries:
+                        records[job['name']] = _failure(job, error)
+                        print(f"[failed] {job['name']}: {error}")
+                    else:
+                        print(f"[retry] {job['name']}: {error}")
+                        (isolated if crashed else shared).append(job)
+                    continue
+                attempts[job['name']] += 1
+                records[job['name']] = record
+                print(f"[done] {job['name']}: {record['employees']:,} employees "
+                      f"in {record['wall_time_s']:.1f}s")
+
+        if broken:
+            position = {job['name']: i for i, job in enumerate(batch)}
+            # Without any started flag (the pool died at start-up) every caught job is a suspect
+            suspects = [job for job in broken if started[position[job['name']]]] or broken
+            print(f"[crash] worker pool broke; {len(suspects)} running job(s) rerun alone, "
+                  f"{len(broken) - len(suspects)} queued job(s) rerun shared")
+            isolated.extend(suspects)
+            shared.extend(job for job in broken if job not in suspects)
+
+    summary = pd.DataFrame([dict(records[job['name']], attempts=attempts[job['name']]) for job in jobs],
+                           columns=SUMMARY_COLUMNS)
+    summary.to_csv(os.path.join(output_root, 'batch_summary.csv'), index=False)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the career progression pipeline for every dataset in a manifest")
+    parser.add_argument('manifest', help="CSV with a data_path column and optional name / n_clusters columns")
+    parser.add_argument('--output-dir', default='batch_results')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument('--blas-threads', type=int, default=None,
+                        help="BLAS/OpenMP threads per worker (default: cores / workers)")
+    parser.add_argument('--retries', type=int, default=1, help="Extra attempts for a failed dataset")
+    parser.add_argument('--clusters', type=int, default=None,
+                        help="Cluster count for datasets without one in the manifest (default: k-sweep)")
+    parser.add_argument('--max-clusters', type=int, default=6)
+    parser.add_argument('--clustering', choices=['kmeans', 'minibatch'], default='kmeans')
+    parser.add_argument('--typed', action='store_true', help="Use schema-typed chunked ingestion")
+    parser.add_argument('--compact', action='store_true', help="Run in float32 / compact-dtype mode")
+    args = parser.parse_args(argv)
+
+    jobs = read_manifest(args.manifest)
+    summary = run_batch(jobs, args.output_dir, workers=args.workers, retries=args.retries,
+                        blas_threads=args.blas_threads, n_clusters=args.clusters,
+                        max_clusters=args.max_clusters, clustering=args.clustering, typed=args.typed,
+                        compact=args.compact)
+
+    print(summary.drop(columns=['data_path', 'output_dir']).to_string(index=False))
+    failed = summary['status'] != 'ok'
+    if failed.any():
+        print(f"\n{failed.sum()} of {len(summary)} dataset(s) failed")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+# Modules that batch scoring and export entry points import on start-up
+STARTUP_MODULES = ['career_progression_analysis', 'career_scorer', 'interventions', 'analysis_cache',
+                   'dashboard_data']
+
+# Heavy libraries none of those modules may load at import time
+LAZY_MODULES = ['matplotlib', 'seaborn', 'sklearn', 'scipy']
+
+# pandas is the floor every module pays; the budget is import time on top of it
+BASELINE_MODULE = 'pandas'
+DEFAULT_BUDGET_S = 0.25
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+def time_import(module, repeats=5):
+    """Median cold import time of a module over fresh interpreters, plus the lazy modules it loaded"""
+    code = _PROBE.format(module=module, lazy=LAZY_MODULES)
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    times = []
+    loaded = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), env=env).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['seconds'])
+        loaded = result['loaded']
+    return float(np.median(times)), loaded
+
+def check_imports(modules=STARTUP_MODULES, budget=DEFAULT_BUDGET_S, repeats=5):
+    """Time each module against the pandas baseline; returns (baseline, records, failures)"""
+    baseline, _ = time_import(BASELINE_MODULE, repeats)
+    records = []
+    for module in modules:
+        seconds, loaded = time_import(module, repeats)
+        records.append({
+            'module': module,
+            'import_time_s': seconds,
+            'over_baseline_s': seconds - baseline,
+            'budget_s': budget,
+            'eager_heavy_modules': loaded,
+            'passed': seconds - baseline <= budget and not loaded,
+        })
+    failures = [record for record in records if not record['passed']]
+    return baseline, records, failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cold import times of the pipeline modules against a budget")
+    parser.add_argument('--modules', nargs='+', default=STARTUP_MODULES)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_S,
+                        help="Allowed import seconds on top of importing pandas")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default=None, help="Append the records to this JSON lines file")
+    args = parser.parse_args(argv)
+
+    baseline, records, failures = check_imports(args.modules, args.budget, args.repeats)
+    print(f"{BASELINE_MODULE + ' (baseline)':<32}{baseline:>8.3f}s")
+    for record in records:
+        status = 'ok' if record['passed'] else 'OVER BUDGET'
+        eager = f"  eager: {', '.join(record['eager_heavy_modules'])}" if record['eager_heavy_modules'] else ''
+        print(f"{record['module']:<32}{record['import_time_s']:>8.3f}s"
+              f"{record['over_baseline_s']:>+9.3f}s  {status}{eager}")
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+    if failures:
+        print(f"\n{len(failures)} module(s) exceeded the {args.budget:.2f}s import budget")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from career_progression_analysis import CareerProgressionAnalyzer
+from dashboard_data import CAREER_STAGES, SharedAnalysisStore
+from pipeline_instrumentation import StageProfiler, peak_rss_bytes
+from synthetic_workforce import write_workforce_csv
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+# Full-batch KMeans is used below this size, the mini-batch backend above it
+MINIBATCH_THRESHOLD = 1_000_000
+
+def current_commit():
+    """Short hash of the checked-out commit, if this is a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def dataset_path(data_dir, n_employees, seed, **kwargs):
+    """Generate (once) and return the synthetic CSV for a workforce size"""
+    suffix = ''.join(f'_{key}{value}' for key, value in sorted(kwargs.items()) if value)
+    path = os.path.join(data_dir, f'workforce_{n_employees}_seed{seed}{suffix}.csv')
+    if not os.path.exists(path):
+        write_workforce_csv(path, n_employees, seed=seed, **kwargs)
+    return path
+
+def dashboard_selections(store):
+    """A representative mix of sidebar selections replayed as reruns"""
+    index = store.filter_index
+    selections = [('All', 'All', 'All', 'All')]
+    for dept in index.options('dept'):
+        selections.append((dept, 'All', 'All', 'All'))
+        for stage in CAREER_STAGES:
+            selections.append((dept, 'All', stage, 'All'))
+    for role in index.options('role')[:5]:
+        for risk in index.options('risk'):
+            selections.append(('All', role, 'All', risk))
+    return selections
+
+def benchmark_dashboard(analyzer, profiler):
+    """Time the per-rerun filter and aggregate work of the dashboard"""
+    with pd.option_context('mode.copy_on_write', True):
+        with profiler.stage('dashboard_store_build', rows_in=len(analyzer.processed_df)) as record:
+            store = SharedAnalysisStore(analyzer)
+            record['rows_out'] = len(store.df)
+
+        selections = dashboard_selections(store)
+        with profiler.stage('dashboard_filter', rows_in=len(selections)) as record:
+            for selection in selections:
+                store.filter_index.filter(*selection)
+            record['rows_out'] = len(selections)
+
+        with profiler.stage('dashboard_aggregates_miss', rows_in=len(selections)) as record:
+            for selection in selections:
+                store.aggregates.get(*selection)
+            record['rows_out'] = len(selections)
+
+        with profiler.stage('dashboard_aggregates_hit', rows_in=len(selections)) as record:
+            for selection in selections:
+                store.aggregates.get(*selection)
+            record['rows_out'] = len(selections)
+
+def benchmark_size(data_path, n_employees, clustering='auto', n_clusters=3, max_clusters=6,
+                   k_sweep=True, typed=False, copy_frames=True, compact=False, trace_memory=False,
+                   count_copies=False):
+    """Run every analyzer stage plus the dashboard work on one dataset"""
+    if clustering == 'auto':
+        clustering = 'minibatch' if n_employees >= MINIBATCH_THRESHOLD else 'kmeans'
+
+    profiler = StageProfiler(trace_memory=trace_memory, count_copies=count_copies)
+    analyzer = CareerProgressionAnalyzer(data_path, profiler=profiler, copy_frames=copy_frames,
+                                         compact=compact)
+
+    # The analyzer reports progress with print; keep benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.load_data(typed=typed)
+        analyzer.feature_engineering()
+        analyzer.preprocess_data()
+        if k_sweep:
+            analyzer.find_optimal_clusters(max_clusters=max_clusters, n_jobs=-1,
+                                           silhouette_method='sampled', plot=False)
+        analyzer.perform_clustering(n_clusters, method=clustering, silhouette_method='sampled')
+        analyzer.interpret_clusters()
+        analyzer.calculate_promotion_gap_risk_score()
+        analyzer.identify_retention_opportunities()
+        analyzer.generate_insights()
+
+    benchmark_dashboard(analyzer, profiler)
+    config = {'clustering': clustering, 'n_clusters': n_clusters, 'max_clusters': max_clusters,
+              'k_sweep': k_sweep, 'typed': typed, 'copy_frames': copy_frames,
+              'compact': compact}
+    return profiler.events, config
+
+def profile_memory(data_path, n_employees, **kwargs):
+    """Memory pass for one size: traced peaks and frame copies per stage plus the process peak RSS
+
+    Meant to run in a fresh process, where ru_maxrss covers this size alone.
+    """
+    events, _ = benchmark_size(data_path, n_employees, trace_memory=True, count_copies=True, **kwargs)
+    stages = [{'stage': event['stage'], 'peak_memory_delta_bytes': event['peak_memory_delta_bytes'],
+               'frame_copies': event['frame_copies']} for event in events]
+    return stages, peak_rss_bytes()
+
+def memory_pass(data_path, n_employees, **kwargs):
+    """Run profile_memory in a process of its own and return its result"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(profile_memory, data_path, n_employees, **kwargs).result()
+
+def to_results(events, n_employees, config, commit, memory=None):
+    """Flatten profiler events into benchmark result records
+
+    memory is the (stages, max_rss) result of memory_pass; the timed run
+    itself carries no tracing, so memory columns are None without it.
+    """
+    stages, max_rss = memory or ([], None)
+    # Both passes run the same stages in the same order
+    measured = {}
+    if [stage['stage'] for stage in stages] == [event['stage'] for event in events]:
+        measured = dict(enumerate(stages))
+    results = []
+    for i, event in enumerate(events):
+        memory_record = measured.get(i, {})
+        wall = event['wall_time_s']
+        rows = event['rows_in'] or n_employees
+        results.append({
+            'commit': commit,
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'n_employees': n_employees,
+            'stage': event['stage'],
+            'depth': event['depth'],
+            'wall_time_s': wall,
+            'cpu_time_s': event['cpu_time_s'],
+            'throughput_rows_per_s': rows / wall if wall > 0 else None,
+            'peak_memory_delta_bytes': memory_record.get('peak_memory_delta_bytes'),
+            'max_rss_bytes': max_rss,
+            'frame_copies': memory_record.get('frame_copies'),
+            'config': config,
+        })
+    return results
+
+def load_results(path):
+    """Read benchmark records written by run_benchmarks"""
+    with open(path) as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+def compare_results(baseline_path, candidate_path, threshold=0.10):
+    """Compare median stage wall times between two result files; returns (table, regressions)"""
+    keys = ['n_employees', 'stage']
+    baseline = load_results(baseline_path).groupby(keys)['wall_time_s'].median()
+    candidate = load_results(candidate_path).groupby(keys)['wall_time_s'].median()
+    table = pd.DataFrame({'baseline_s': baseline, 'candidate_s': candidate}).dropna()
+    table['ratio'] = table['candidate_s'] / table['baseline_s']
+    regressions = table[table['ratio'] > 1 + threshold]
+    return table, regressions
+
+def run_benchmarks(sizes, output, data_dir='.benchmark_data', seed=42, n_departments=None,
+                   n_roles_per_department=None, measure_memory=True, **kwargs):
+    """Benchmark each workforce size and append the records to the output file
+
+    Stages are timed with memory tracing off. With measure_memory, a second
+    run of each size in its own process records the traced peaks, frame
+    copies and peak RSS.
+    """
+    commit = current_commit()
+    for n_employees in sizes:
+        data_path = dataset_path(data_dir, n_employees, seed, n_departments=n_departments,
+                                 n_roles_per_department=n_roles_per_department)
+        events, config = benchmark_size(data_path, n_employees, **kwargs)
+        config.update({'seed': seed, 'n_departments': n_departments,
+                       'n_roles_per_department': n_roles_per_department})
+        memory = memory_pass(data_path, n_employees, **kwargs) if measure_memory else None
+        results = to_results(events, n_employees, config, commit, memory)
+
+        with open(output, 'a') as f:
+            for record in results:
+                f.write(json.dumps(record) + '\n')
+
+        print(f"\n=== {n_employees:,} employees ===")
+        for record in results:
+            stage = '  ' * record['depth'] + record['stage']
+            throughput = record['throughput_rows_per_s']
+            print(f"{stage:<36}{record['wall_time_s']:>10.3f}s"
+                  f"{(throughput or 0):>16,.0f} items/s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the career progression pipeline on synthetic workforces")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--output', default='benchmark_results.jsonl')
+    parser.add_argument('--data-dir', default='.benchmark_data')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--departments', type=int, default=None, help="Department cardinality")
+    parser.add_argument('--roles-per-department', type=int, default=None, help="Job role cardinality per department")
+    parser.add_argument('--clustering', choices=['auto', 'kmeans', 'minibatch'], default='auto')
+    parser.add_argument('--no-k-sweep', action='store_true', help="Skip find_optimal_clusters")
+    parser.add_argument('--typed', action='store_true', help="Use schema-typed chunked ingestion")
+    parser.add_argument('--copy-free', action='store_true', help="Run the analyzer stages without defensive frame copies")
+    parser.add_argument('--compact', action='store_true', help="Run in float32 / compact-dtype mode")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Skip the separate memory pass (traced peaks, frame copies, peak RSS)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="Compare two result files instead of running benchmarks")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Regression threshold for --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        table, regressions = compare_results(*args.compare, threshold=args.threshold)
+        print(table.round(3).to_string())
+        if len(regressions):
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        return 0
+
+    run_benchmarks(args.sizes, args.output, data_dir=args.data_dir, seed=args.seed,
+                   n_departments=args.departments, n_roles_per_department=args.roles_per_department,
+                   clustering=args.clustering, k_sweep=not args.no_k_sweep, typed=args.typed,
+                   copy_frames=not args.copy_free, compact=args.compact, measure_memory=not args.no_memory)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
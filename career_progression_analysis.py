@@ -1,106 +1,717 @@
+import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import silhouette_score
-from scipy.cluster.hierarchy import dendrogram, linkage
+from pandas.api.types import union_categoricals
+from joblib import Parallel, delayed
+from peer_index import PeerIndex
+from quantile_sketch import fill_and_bounds, merge_sketches, sketch_frame
+from pipeline_instrumentation import JsonLinesSink, StageProfiler, instrumented_stage
 import warnings
 warnings.filterwarnings('ignore')
 
+# sklearn, matplotlib and scipy are imported inside the methods that use them,
+# so importing this module for its helpers (scoring, interventions) stays fast
+
+# Declared dtypes for the columns the analyzer and dashboard read
+# Ordinal HR fields fit in int8, tenure counts in int16, string fields are categorical
+CSV_SCHEMA = {
+    'Age': 'int8',
+    'Attrition': 'int8',
+    'JobLevel': 'int8',
+    'JobSatisfaction': 'int8',
+    'EnvironmentSatisfaction': 'int8',
+    'PerformanceRating': 'int8',
+    'TrainingTimesLastYear': 'int8',
+    'MonthlyIncome': 'int32',
+    'TotalWorkingYears': 'int16',
+    'YearsAtCompany': 'int16',
+    'YearsInCurrentRole': 'int16',
+    'YearsSinceLastPromotion': 'int16',
+    'YearsWithCurrManager': 'int16',
+    'Department': 'category',
+    'JobRole': 'category',
+    'EducationField': 'category',
+    'Gender': 'category',
+    'MaritalStatus': 'category',
+    'BusinessTravel': 'category',
+    'OverTime': 'category',
+}
+
+def _downcast_chunk_column(values, dtype):
+    """Cast one parsed chunk column to its declared integer dtype"""
+    dtype = np.dtype(dtype)
+    
+    # Nulls or out-of-range values widen the chunk instead of wrapping silently;
+    # the final concatenation promotes the whole column to the wider type
+    if values.isna().any():
+        return values.to_numpy(dtype=np.result_type(dtype, np.float32), na_value=np.nan)
+    info = np.iinfo(dtype)
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        return values.to_numpy(dtype=np.int64)
+    return values.to_numpy(dtype=dtype)
+
+def read_typed_csv(data_path, schema=CSV_SCHEMA, chunksize=250_000):
+    """Read only the schema columns of a CSV in chunks with compact dtypes"""
+    header = pd.read_csv(data_path, nrows=0).columns
+    usecols = [col for col in header if col in schema]
+    category_dtypes = {col: 'category' for col in usecols if schema[col] == 'category'}
+    
+    # Parse chunk by chunk so only one chunk of raw values is alive at a time
+    parts = {col: [] for col in usecols}
+    reader = pd.read_csv(data_path, usecols=usecols, dtype=category_dtypes, chunksize=chunksize)
+    for chunk in reader:
+        for col in usecols:
+            if schema[col] == 'category':
+                parts[col].append(chunk[col].array)
+            else:
+                parts[col].append(_downcast_chunk_column(chunk[col], schema[col]))
+        del chunk
+    
+    columns = {}
+    for col in usecols:
+        chunks = parts.pop(col)
+        if schema[col] == 'category':
+            columns[col] = union_categoricals(chunks) if chunks else pd.Categorical([])
+        else:
+            columns[col] = np.concatenate(chunks) if chunks else np.array([], dtype=schema[col])
+        del chunks
+    
+    return pd.DataFrame(columns, columns=usecols, copy=False)
+
+def downcast_integer_columns(df):
+    """Store every integer column in the smallest integer dtype that holds its values"""
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col].dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+# Promotion gap risk criteria: (feature, comparison, [(threshold, points), ...])
+# Tiers are checked in order and the first matching tier awards its points
+RISK_SCORING_CRITERIA = [
+    ('PromotionGapRatio', '>', [(0.6, 3), (0.4, 2), (0.2, 1)]),          # High promotion gap ratio
+    ('RoleStagnationIndex', '>', [(0.7, 3), (0.5, 2), (0.3, 1)]),        # High role stagnation
+    ('TrainingIntensityScore', '<', [(0.1, 2), (0.2, 1)]),               # Low training intensity
+    ('CareerVelocityScore', '<', [(0.1, 2), (0.2, 1)]),                  # Low career velocity
+    ('ManagerStabilityIndicator', '<', [(0.3, 1)]),                      # Manager instability
+]
+
+# Risk level cutoffs: (minimum score, level), highest first
+RISK_LEVEL_CUTOFFS = [(7, 'High'), (4, 'Medium')]
+DEFAULT_RISK_LEVEL = 'Low'
+
+COMPARISONS = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}
+
+def score_promotion_gap_risk(df, criteria=RISK_SCORING_CRITERIA):
+    """Compute promotion gap risk scores as whole-column operations"""
+    scores = np.zeros(len(df), dtype=np.int64)
+    
+    for feature, comparison, tiers in criteria:
+        values = df[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+        compare = COMPARISONS[comparison]
+        
+        # np.select picks the first matching tier, mirroring an if/elif chain
+        conditions = [compare(values, threshold) for threshold, _ in tiers]
+        scores += np.select(conditions, [points for _, points in tiers], default=0)
+    
+    return scores
+
+def categorize_risk_levels(scores, cutoffs=RISK_LEVEL_CUTOFFS, default=DEFAULT_RISK_LEVEL):
+    """Map risk scores to risk level labels"""
+    scores = np.asarray(scores)
+    labels = np.array([label for _, label in cutoffs] + [default], dtype=object)
+    
+    # Index into a small label table so every row shares the same string objects
+    codes = np.select([scores >= cutoff for cutoff, _ in cutoffs],
+                      np.arange(len(cutoffs)), default=len(cutoffs))
+    return labels[codes]
+
+# Career progression metrics added by feature engineering, declared as
+# name: (numerator column, denominator column, denominator offset)
+DERIVED_FEATURE_SPECS = {
+    'PromotionGapRatio': ('YearsSinceLastPromotion', 'YearsAtCompany', 1e-6),
+    'RoleStagnationIndex': ('YearsInCurrentRole', 'YearsAtCompany', 1e-6),
+    'TrainingIntensityScore': ('TrainingTimesLastYear', 'YearsAtCompany', 1e-6),
+    'ManagerStabilityIndicator': ('YearsWithCurrManager', 'YearsAtCompany', 1e-6),
+    'CareerVelocityScore': ('JobLevel', 'YearsAtCompany', 1e-6),
+    'IncomeGrowthPotential': ('MonthlyIncome', 'YearsAtCompany', 1),
+    'ExperienceUtilization': ('TotalWorkingYears', 'Age', 1e-6),
+}
+DERIVED_FEATURES = list(DERIVED_FEATURE_SPECS)
+
+# Derived metrics that enter the clustering matrix; registered features are
+# only added here on request, so reporting ratios never move the clusters
+CLUSTER_DERIVED_FEATURES = list(DERIVED_FEATURE_SPECS)
+
+# Raw and encoded columns used as clustering features
+BASE_CLUSTER_FEATURES = ['Age', 'JobLevel', 'TotalWorkingYears', 'YearsAtCompany',
+                         'YearsInCurrentRole', 'YearsSinceLastPromotion', 'YearsWithCurrManager']
+ENCODED_CATEGORICAL_COLUMNS = ['Department', 'JobRole', 'EducationField', 'Gender',
+                               'MaritalStatus', 'BusinessTravel', 'OverTime']
+
+def register_derived_feature(name, numerator, denominator, offset=1e-6, cluster=False):
+    """Declare a new ratio feature; it is computed like the built-in ones
+
+    cluster=True also makes it a clustering feature, which changes the
+    fitted scaler and cluster assignments of every later fit.
+    """
+    DERIVED_FEATURE_SPECS[name] = (numerator, denominator, offset)
+    if name not in DERIVED_FEATURES:
+        DERIVED_FEATURES.append(name)
+    if cluster and name not in CLUSTER_DERIVED_FEATURES:
+        CLUSTER_DERIVED_FEATURES.append(name)
+
+def derived_feature_inputs(features=None):
+    """Raw columns needed to compute the given derived features"""
+    inputs = []
+    for name in DERIVED_FEATURES if features is None else features:
+        for col in DERIVED_FEATURE_SPECS[name][:2]:
+            if col not in inputs:
+                inputs.append(col)
+    return inputs
+
+def compute_derived_features(df, features=None, dtype=np.float64):
+    """Compute derived features as arrays in one pass over their inputs
+    
+    Each input column is converted once and each offset denominator is built
+    once, however many features share it; the divisions write straight into
+    arrays of the requested dtype.
+    """
+    features = DERIVED_FEATURES if features is None else features
+    columns = {}
+    denominators = {}
+    results = {}
+    for name in features:
+        numerator, denominator, offset = DERIVED_FEATURE_SPECS[name]
+        for col in (numerator, denominator):
+            if col not in columns:
+                columns[col] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        if (denominator, offset) not in denominators:
+            denominators[denominator, offset] = columns[denominator] + offset
+        out = np.empty(len(df), dtype=dtype)
+        results[name] = np.divide(columns[numerator], denominators[denominator, offset], out=out,
+                                  casting='same_kind')
+    return results
+
+def engineer_features(df, features=None, dtype=np.float64):
+    """Add the derived career progression metrics to a frame in place"""
+    for name, values in compute_derived_features(df, features, dtype).items():
+        df[name] = values
+    return df
+
+def retention_opportunity_mask(df):
+    """Flag employees who show stagnation signals but are still engaged"""
+    return (
+        (df['Attrition'] == 0) &  # Not yet disengaged
+        (df['PromotionGapRiskLevel'].isin(['Medium', 'High'])) &  # Show career stagnation signals
+        (df['JobSatisfaction'] >= 3) &  # Still satisfied with job
+        (df['EnvironmentSatisfaction'] >= 3)  # Satisfied with environment
+    )
+
+# Columns read by calculate_retention_opportunity_index
+RETENTION_INDEX_COLUMNS = ['PromotionGapRiskScore', 'JobSatisfaction', 'EnvironmentSatisfaction',
+                           'RoleStagnationIndex']
+
+def calculate_retention_opportunity_index(df):
+    """Weight risk, satisfaction headroom and role stagnation into one priority index"""
+    return (
+        df['PromotionGapRiskScore'] * 0.4 +
+        (5 - df['JobSatisfaction']) * 0.2 +
+        (5 - df['EnvironmentSatisfaction']) * 0.2 +
+        df['RoleStagnationIndex'] * 10 * 0.2
+    )
+
+class RetentionRanking:
+    def __init__(self, df, mask=None):
+        """Rank retention candidates by RetentionOpportunityIndex without sorting them all
+        
+        mask selects the candidate rows (retention_opportunity_mask by default).
+        Only the index values of candidates are kept; top() and page() use
+        partial selection, so showing the head of a large ranking is O(n).
+        Ties keep row order and rows with a null index rank last.
+        """
+        self.df = df
+        self.custom_mask = mask is not None
+        mask = retention_opportunity_mask(df) if mask is None else mask
+        self.positions = np.flatnonzero(np.asarray(mask, dtype=bool))
+        self.values = self._index_values(self.positions)
+    
+    def _index_values(self, positions):
+        rows = pd.DataFrame({col: self.df[col].to_numpy()[positions] for col in RETENTION_INDEX_COLUMNS})
+        return calculate_retention_opportunity_index(rows).to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    def __len__(self):
+        return len(self.positions)
+    
+    def column(self, name):
+        """Values of a column for the candidate rows, in candidate order"""
+        return self.df[name].to_numpy()[self.positions]
+    
+    def count_at_least(self, threshold):
+        """Candidates whose index is at least threshold"""
+        return int(np.count_nonzero(self.values >= threshold))
+    
+    def mean(self):
+        """Mean index over the candidates, ignoring nulls"""
+        return float(np.nanmean(self.values)) if len(self) else np.nan
+    
+    def _ranked(self, k):
+        """Candidate slots of the k best-ranked rows, best first"""
+        keys = np.where(np.isnan(self.values), -np.inf, self.values)
+        k = min(k, len(keys))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if k < len(keys):
+            # Partial selection: everything above the k-th largest value, then
+            # the earliest rows among those tied with it
+            kth = np.partition(keys, len(keys) - k)[len(keys) - k]
+            above = np.flatnonzero(keys > kth)
+            tied = np.flatnonzero(keys == kth)
+            tied = tied[np.argsort(self.positions[tied], kind='stable')[:k - len(above)]]
+            chosen = np.concatenate([above, tied])
+        else:
+            chosen = np.arange(len(keys))
+        return chosen[np.lexsort((self.positions[chosen], -keys[chosen]))]
+    
+    def _frame(self, slots):
+        rows = self.df.take(self.positions[slots])
+        rows['RetentionOpportunityIndex'] = self.values[slots]
+        return rows
+    
+    def top(self, k=10):
+        """The k highest-priority candidates with their index, best first"""
+        return self._frame(self._ranked(k))
+    
+    def page(self, page, page_size=20):
+        """One page (0-based) of the ranked candidates"""
+        start = page * page_size
+        return self._frame(self._ranked(start + page_size)[start:])
+    
+    def frame(self):
+        """Every candidate in ranked order"""
+        return self._frame(self._ranked(len(self)))
+    
+    def drop(self, df, labels):
+        """Remove the employees with the given index labels; df is the frame without them"""
+        removed = np.sort(self.df.index.get_indexer(labels))
+        if (removed < 0).any():
+            raise KeyError("Some removed employees are not in the frame")
+        keep = ~np.isin(self.positions, removed)
+        # Remaining rows move up by the number of removed rows before them
+        self.positions = self.positions[keep] - np.searchsorted(removed, self.positions[keep])
+        self.values = self.values[keep]
+        self.df = df
+        return self
+    
+    def update(self, df, labels, mask=None):
+        """Re-rank only the employees with the given index labels after their rows changed in df
+        
+        mask flags which of those employees are candidates; it is required
+        when the ranking was built from a custom mask.
+        """
+        if mask is None and self.custom_mask:
+            raise ValueError("Pass the candidate mask for the changed rows of a custom-mask ranking")
+        self.df = df
+        changed = df.index.get_indexer(labels)
+        if (changed < 0).any():
+            raise KeyError("Some updated employees are not in the frame")
+        if mask is None:
+            mask = retention_opportunity_mask(df.take(changed))
+        added = changed[np.asarray(mask, dtype=bool)]
+        
+        keep = ~np.isin(self.positions, changed)
+        self.positions = np.concatenate([self.positions[keep], added])
+        self.values = np.concatenate([self.values[keep], self._index_values(added)])
+        return self
+
+# Grouping keys and per-employee measures summarized by WorkforceSummary
+SUMMARY_KEYS = ['CareerCluster', 'Department', 'PromotionGapRiskLevel']
+SUMMARY_MEASURES = ['Age', 'JobLevel', 'YearsAtCompany', 'PromotionGapRatio', 'RoleStagnationIndex',
+                    'TrainingIntensityScore', 'CareerVelocityScore', 'Attrition', 'MonthlyIncome',
+                    'PromotionGapRiskScore', 'YearsWithCurrManager']
+
+# Training intensity below this counts as very low
+LOW_TRAINING_THRESHOLD = 0.1
+
+class WorkforceSummary:
+    def __init__(self, df, low_training_threshold=LOW_TRAINING_THRESHOLD):
+        """Sums and counts of every summary measure per cluster, department and risk level
+        
+        One grouped pass over the rows builds a small cube; the per-cluster,
+        per-department and per-risk-level figures are re-aggregated from it.
+        Keys and measures missing from the frame are skipped.
+        """
+        self.rows = len(df)
+        self.keys = [key for key in SUMMARY_KEYS if key in df.columns]
+        self.measures = [col for col in SUMMARY_MEASURES if col in df.columns]
+        
+        values = {col: df[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in self.measures}
+        if 'TrainingIntensityScore' in df.columns:
+            values['LowTraining'] = (df['TrainingIntensityScore'] < low_training_threshold).to_numpy(dtype=np.float64)
+            self.measures.append('LowTraining')
+        
+        # Combine the factorized keys into one cell id per row (code 0 holds nulls)
+        cells = np.zeros(self.rows, dtype=np.int64)
+        uniques = {}
+        for key in self.keys:
+            codes, uniques[key] = pd.factorize(df[key])
+            cells = cells * (len(uniques[key]) + 1) + (codes + 1)
+        n_cells = int(np.prod([len(uniques[key]) + 1 for key in self.keys]))
+        
+        # bincount accumulates every measure per cell in a single O(n) sweep
+        size = np.bincount(cells, minlength=n_cells)
+        occupied = np.flatnonzero(size)
+        cube = {}
+        remainder = occupied
+        for key in reversed(self.keys):
+            width = len(uniques[key]) + 1
+            key_codes = remainder % width - 1
+            key_values = pd.Index(uniques[key]).take(np.maximum(key_codes, 0))
+            # Code -1 is a null key; it becomes NA so by() drops it like groupby does
+            cube[key] = key_values.where(key_codes >= 0) if (key_codes < 0).any() else key_values
+            remainder = remainder // width
+        cube = {key: cube[key] for key in self.keys}
+        cube['size'] = size[occupied]
+        for col in self.measures:
+            present = ~np.isnan(values[col])
+            cube[f'{col}_sum'] = np.bincount(cells, weights=np.where(present, values[col], 0),
+                                             minlength=n_cells)[occupied]
+            cube[f'{col}_count'] = np.bincount(cells, weights=present, minlength=n_cells)[occupied]
+        self.cube = pd.DataFrame(cube)
+    
+    @classmethod
+    def combine(cls, summaries, signs=None):
+        """Merge summaries of disjoint row sets (e.g. partitions) into one
+        
+        A sign of -1 subtracts a summary, so rows that changed or left can be
+        taken back out of a running total.
+        """
+        summaries = list(summaries)
+        signs = [1] * len(summaries) if signs is None else list(signs)
+        summary = cls.__new__(cls)
+        summary.rows = sum(sign * part.rows for part, sign in zip(summaries, signs))
+        summary.keys = summaries[0].keys
+        summary.measures = summaries[0].measures
+        
+        cubes = []
+        for part, sign in zip(summaries, signs):
+            if part.rows == 0:
+                continue
+            cube = part.cube.copy()
+            totals = cube.columns.difference(part.keys)
+            cube[totals] = cube[totals] * sign
+            cubes.append(cube)
+        cube = pd.concat(cubes, ignore_index=True) if cubes else summaries[0].cube.iloc[:0]
+        cube = cube.groupby(summary.keys, dropna=False, sort=False, observed=True).sum().reset_index()
+        summary.cube = cube[cube['size'] != 0].reset_index(drop=True)
+        return summary
+    
+    def by(self, key):
+        """Group size and mean of every measure for each value of one key"""
+        grouped = self.cube.groupby(key, observed=True)
+        sums = grouped[[f'{col}_sum' for col in self.measures]].sum().to_numpy()
+        counts = grouped[[f'{col}_count' for col in self.measures]].sum().to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table = pd.DataFrame(sums / counts, index=grouped['size'].sum().index, columns=self.measures)
+        table.insert(0, 'size', grouped['size'].sum())
+        return table
+    
+    def mean(self, measure):
+        """Mean of a measure over all rows, ignoring nulls"""
+        return self.cube[f'{measure}_sum'].sum() / self.cube[f'{measure}_count'].sum()
+    
+    def count(self, key, value):
+        """Number of rows whose key equals value"""
+        return int(self.cube.loc[self.cube[key] == value, 'size'].sum())
+    
+    def largest(self, key):
+        """Most frequent value of a key and its row count"""
+        sizes = self.by(key)['size'].sort_values(ascending=False, kind='stable')
+        return sizes.index[0], int(sizes.iloc[0])
+    
+    @property
+    def low_training(self):
+        """Rows with very low training intensity"""
+        return int(self.cube['LowTraining_sum'].sum())
+
+def summarize_clusters(summary):
+    """Per-cluster profile and career pattern label from a workforce summary"""
+    cluster_stats = summary.by('CareerCluster')
+    cluster_stats = cluster_stats.reindex(range(len(cluster_stats)))
+    
+    cluster_analysis = {}
+    for cluster_id, stats in cluster_stats.iterrows():
+        analysis = {
+            'size': int(stats['size']) if pd.notna(stats['size']) else 0,
+            'avg_age': stats['Age'],
+            'avg_job_level': stats['JobLevel'],
+            'avg_years_at_company': stats['YearsAtCompany'],
+            'avg_promotion_gap_ratio': stats['PromotionGapRatio'],
+            'avg_role_stagnation': stats['RoleStagnationIndex'],
+            'avg_training_intensity': stats['TrainingIntensityScore'],
+            'avg_career_velocity': stats['CareerVelocityScore'],
+            'attrition_rate': stats['Attrition'] * 100,
+            'avg_income': stats['MonthlyIncome']
+        }
+        
+        cluster_analysis[cluster_id] = analysis
+    
+    # Create cluster labels based on patterns
+    cluster_labels = {}
+    for cluster_id, analysis in cluster_analysis.items():
+        if analysis['avg_career_velocity'] > 0.5 and analysis['avg_promotion_gap_ratio'] < 0.3:
+            cluster_labels[cluster_id] = "Fast-Track Performers"
+        elif analysis['avg_years_at_company'] > 10 and analysis['avg_role_stagnation'] < 0.4:
+            cluster_labels[cluster_id] = "Stable Long-Term Contributors"
+        elif analysis['avg_years_at_company'] < 3:
+            cluster_labels[cluster_id] = "Early-Career Explorers"
+        elif analysis['avg_promotion_gap_ratio'] > 0.6 and analysis['avg_role_stagnation'] > 0.6:
+            cluster_labels[cluster_id] = "High-Risk Stagnation Profiles"
+        elif analysis['avg_promotion_gap_ratio'] > 0.4:
+            cluster_labels[cluster_id] = "Promotion-Stalled Employees"
+        else:
+            cluster_labels[cluster_id] = "Career Development Candidates"
+    
+    return cluster_analysis, cluster_labels
+
+def workforce_insights(summary, cluster_labels, n_opportunities):
+    """Key stakeholder insights from a scored, clustered workforce summary"""
+    insights = []
+    
+    # Cluster insights
+    largest_cluster, largest_cluster_size = summary.largest('CareerCluster')
+    largest_cluster_label = cluster_labels[largest_cluster]
+    
+    insights.append(f"The largest career group is '{largest_cluster_label}' with "
+                   f"{largest_cluster_size} employees ({largest_cluster_size/summary.rows*100:.1f}%)")
+    
+    # Risk insights
+    high_risk_count = summary.count('PromotionGapRiskLevel', 'High')
+    insights.append(f"{high_risk_count} employees ({high_risk_count/summary.rows*100:.1f}%) "
+                   "are at high risk of promotion stagnation")
+    
+    # Retention opportunities
+    insights.append(f"{n_opportunities} employees show retention opportunities "
+                   "through career intervention")
+    
+    # Department insights
+    dept_risk = summary.by('Department')['PromotionGapRiskScore'].sort_values(ascending=False)
+    highest_risk_dept = dept_risk.index[0]
+    insights.append(f"The '{highest_risk_dept}' department shows the highest average promotion gap risk")
+    
+    # Training insights
+    low_training = summary.low_training
+    insights.append(f"{low_training} employees ({low_training/summary.rows*100:.1f}%) "
+                   "have very low training intensity")
+    
+    return insights
+
+def stratified_sample_indices(labels, sample_size, random_state=42):
+    """Draw row positions so every cluster keeps its share of the sample"""
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(random_state)
+    fraction = sample_size / len(labels)
+    
+    picks = []
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        take = min(len(members), max(1, int(round(len(members) * fraction))))
+        picks.append(rng.choice(members, size=take, replace=False))
+    return np.sort(np.concatenate(picks))
+
+def _centroid_silhouette(X, labels, centers):
+    """Simplified silhouette using distances to centroids instead of to every point"""
+    from sklearn.metrics.pairwise import euclidean_distances
+    distances = euclidean_distances(X, centers)
+    rows = np.arange(len(labels))
+    own = distances[rows, labels]
+    distances[rows, labels] = np.inf
+    nearest_other = distances.min(axis=1)
+    return (nearest_other - own) / np.maximum(np.maximum(own, nearest_other), 1e-12)
+
+def estimate_silhouette(X, labels, centers=None, method='exact', sample_size=10000, random_state=42):
+    """Estimate the silhouette score and a 95% error bound
+    
+    method='exact' uses every row (error 0), 'sampled' averages exact
+    silhouettes over a stratified sample and reports its confidence half-width,
+    and 'centroid' scores every row against cluster centroids in O(n*k), with
+    the bound measured against the exact silhouette on a stratified sample.
+    """
+    # sklearn.metrics is only needed by the k-sweep and silhouette reporting
+    from sklearn.metrics import silhouette_samples, silhouette_score
+    
+    labels = np.asarray(labels)
+    if method == 'exact' or (method == 'sampled' and sample_size >= len(labels)):
+        return silhouette_score(X, labels), 0.0
+    
+    sample = stratified_sample_indices(labels, min(sample_size, len(labels)), random_state)
+    sample_values = silhouette_samples(X[sample], labels[sample])
+    half_width = 1.96 * sample_values.std() / np.sqrt(len(sample_values))
+    
+    if method == 'sampled':
+        return sample_values.mean(), half_width
+    if method == 'centroid':
+        if centers is None:
+            raise ValueError("centroid silhouette needs the cluster centers")
+        score = _centroid_silhouette(X, labels, centers).mean()
+        calibration = _centroid_silhouette(X[sample], labels[sample], centers).mean()
+        return score, abs(calibration - sample_values.mean()) + half_width
+    raise ValueError(f"Unknown silhouette method: {method}")
+
+def _evaluate_k(X, k, silhouette_method, silhouette_sample_size):
+    """Fit one candidate k and score it; runs inside a k-sweep worker"""
+    from sklearn.cluster import KMeans
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
+    cluster_labels = kmeans.fit_predict(X)
+    score, error = estimate_silhouette(X, cluster_labels, kmeans.cluster_centers_,
+                                       silhouette_method, silhouette_sample_size)
+    return kmeans.inertia_, score, error
+
 class CareerProgressionAnalyzer:
-    def __init__(self, data_path):
-        """Initialize the analyzer with dataset path"""
+    def __init__(self, data_path, profiler=None, copy_frames=True, compact=False):
+        """Initialize the analyzer with dataset path
+        
+        With copy_frames=False the stages add their columns to one shared frame
+        in place instead of taking a defensive copy per stage, so self.df and
+        self.processed_df become the same object. compact=True keeps integer
+        fields in their smallest dtype and derived features, X_scaled and the
+        centroids in float32 (see validate_precision.py for the accuracy check).
+        """
         self.data_path = data_path
+        self.profiler = profiler
+        self.copy_frames = copy_frames
+        self.compact = compact
+        self.feature_dtype = np.float32 if compact else np.float64
         self.df = None
         self.processed_df = None
-        self.scaler = StandardScaler()
+        self.scaler = None
         self.kmeans_model = None
         self.clusters = None
+        self._derived_cache = {}
         
-    def load_data(self):
-        """Load and explore the dataset"""
-        self.df = pd.read_csv(self.data_path)
+    def _stage_frame(self, df):
+        """Frame a stage writes into: a copy by default, the shared frame in copy-free mode"""
+        return df.copy() if self.copy_frames else df
+    
+    @instrumented_stage('load_data')
+    def load_data(self, typed=False, chunksize=250_000):
+        """Load and explore the dataset
+        
+        With typed=True only the CSV_SCHEMA columns are parsed, in chunks, into
+        compact integer and categorical dtypes.
+        """
+        if typed:
+            self.df = read_typed_csv(self.data_path, chunksize=chunksize)
+        else:
+            self.df = pd.read_csv(self.data_path)
+        if self.compact:
+            downcast_integer_columns(self.df)
+        self._derived_cache = {}
         print(f"Dataset loaded with {self.df.shape[0]} employees and {self.df.shape[1]} features")
         print("\nDataset Info:")
         print(self.df.info())
         return self.df
     
-    def feature_engineering(self):
-        """Create derived career progression metrics"""
-        df = self.df.copy()
-        
-        # Promotion Gap Ratio = YearsSinceLastPromotion / YearsAtCompany
-        df['PromotionGapRatio'] = df['YearsSinceLastPromotion'] / (df['YearsAtCompany'] + 1e-6)
-        
-        # Role Stagnation Index = YearsInCurrentRole / YearsAtCompany
-        df['RoleStagnationIndex'] = df['YearsInCurrentRole'] / (df['YearsAtCompany'] + 1e-6)
-        
-        # Training Intensity Score = TrainingTimesLastYear / YearsAtCompany
-        df['TrainingIntensityScore'] = df['TrainingTimesLastYear'] / (df['YearsAtCompany'] + 1e-6)
-        
-        # Manager Stability Indicator = YearsWithCurrManager / YearsAtCompany
-        df['ManagerStabilityIndicator'] = df['YearsWithCurrManager'] / (df['YearsAtCompany'] + 1e-6)
-        
-        # Career Velocity Score = JobLevel / YearsAtCompany
-        df['CareerVelocityScore'] = df['JobLevel'] / (df['YearsAtCompany'] + 1e-6)
-        
-        # Income Growth Potential = MonthlyIncome / (YearsAtCompany + 1)
-        df['IncomeGrowthPotential'] = df['MonthlyIncome'] / (df['YearsAtCompany'] + 1)
-        
-        # Experience Utilization = TotalWorkingYears / Age
-        df['ExperienceUtilization'] = df['TotalWorkingYears'] / (df['Age'] + 1e-6)
+    def derived_features(self, features=None, dtype=None):
+        """Derived metrics for the loaded data, computed on first request and memoized"""
+        features = DERIVED_FEATURES if features is None else features
+        dtype = np.dtype(self.feature_dtype if dtype is None else dtype)
+        missing = [name for name in features if (name, dtype) not in self._derived_cache]
+        if missing:
+            for name, values in compute_derived_features(self.df, missing, dtype).items():
+                self._derived_cache[name, dtype] = values
+        return {name: self._derived_cache[name, dtype] for name in features}
+    
+    def _require_derived(self, features):
+        """Add any of the given derived features missing from processed_df"""
+        missing = [name for name in features if name not in self.processed_df.columns]
+        for name, values in self.derived_features(missing).items():
+            self.processed_df[name] = values
+    
+    @instrumented_stage('feature_engineering')
+    def feature_engineering(self, features=None, dtype=None):
+        """Create derived career progression metrics
+        
+        features selects a subset of DERIVED_FEATURES; later stages add any
+        others they need on demand. dtype=np.float32 halves their memory and
+        is the default in compact mode.
+        """
+        features = DERIVED_FEATURES if features is None else features
+        df = self._stage_frame(self.df)
+        for name, values in self.derived_features(features, dtype).items():
+            df[name] = values
         
         self.processed_df = df
         print("Feature engineering completed. New features created:")
-        print(['PromotionGapRatio', 'RoleStagnationIndex', 'TrainingIntensityScore', 
-              'ManagerStabilityIndicator', 'CareerVelocityScore', 'IncomeGrowthPotential', 
-              'ExperienceUtilization'])
+        print(features)
         return df
     
-    def preprocess_data(self):
-        """Preprocess data for clustering"""
+    @instrumented_stage('preprocess_data')
+    def preprocess_data(self, quantiles='exact', sketch_chunksize=250_000, sketch_capacity=2048):
+        """Preprocess data for clustering
+        
+        With quantiles='sketch' the median fill values and 1%/99% clip bounds
+        come from mergeable per-chunk quantile sketches built in one pass
+        (see quantile_sketch.py) instead of separate full-column quantiles.
+        """
         if self.processed_df is None:
             self.feature_engineering()
         
-        df = self.processed_df.copy()
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        
+        self._require_derived(DERIVED_FEATURES)
+        df = self.processed_df
         
         # Select career-related features for clustering
-        career_features = [
-            'Age', 'JobLevel', 'TotalWorkingYears', 'YearsAtCompany', 
-            'YearsInCurrentRole', 'YearsSinceLastPromotion', 'YearsWithCurrManager',
-            'PromotionGapRatio', 'RoleStagnationIndex', 'TrainingIntensityScore',
-            'ManagerStabilityIndicator', 'CareerVelocityScore', 'IncomeGrowthPotential',
-            'ExperienceUtilization'
-        ]
-        
-        # Handle categorical variables
-        categorical_cols = ['Department', 'JobRole', 'EducationField', 'Gender', 
-                           'MaritalStatus', 'BusinessTravel', 'OverTime']
+        career_features = BASE_CLUSTER_FEATURES + CLUSTER_DERIVED_FEATURES
+        feature_columns = {col: df[col] for col in career_features}
+        
+        # Handle categorical variables; encoded columns only live in the feature matrix
+        categorical_cols = ENCODED_CATEGORICAL_COLUMNS
         
         le_dict = {}
         for col in categorical_cols:
             if col in df.columns:
                 le = LabelEncoder()
-                df[col + '_Encoded'] = le.fit_transform(df[col].astype(str))
+                feature_columns[col + '_Encoded'] = le.fit_transform(df[col].astype(str))
                 le_dict[col] = le
                 career_features.append(col + '_Encoded')
         
-        # Extract features for clustering
-        X = df[career_features].copy()
-        
-        # Handle missing values
-        X.fillna(X.median(), inplace=True)
-        
-        # Remove extreme outliers (late-career edge cases)
-        for col in X.columns:
-            Q1 = X[col].quantile(0.01)
-            Q3 = X[col].quantile(0.99)
-            X[col] = np.clip(X[col], Q1, Q3)
-        
-        # Normalize features
-        X_scaled = self.scaler.fit_transform(X)
+        # Extract features for clustering into their own matrix
+        X = pd.DataFrame(feature_columns, columns=career_features)
+        
+        if quantiles == 'sketch':
+            # One pass of chunk sketches, merged, gives the fill values and clip bounds
+            partials = [sketch_frame(X.iloc[start:start + sketch_chunksize], capacity=sketch_capacity)
+                        for start in range(0, len(X), sketch_chunksize)]
+            sketches = merge_sketches(partials)
+            fill_values, self.clip_bounds = fill_and_bounds(sketches)
+            self.fill_values = pd.Series(fill_values)
+            self.quantile_rank_error = max(sketch.rank_error for sketch in sketches.values())
+            
+            # Fill and clip the whole matrix in one vectorized step
+            lower = np.array([self.clip_bounds[col][0] for col in career_features])
+            upper = np.array([self.clip_bounds[col][1] for col in career_features])
+            values = X.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = np.where(np.isnan(values), self.fill_values[career_features].to_numpy(), values)
+            X = pd.DataFrame(np.clip(values, lower, upper), columns=career_features, index=X.index, copy=False)
+        elif quantiles == 'exact':
+            # Handle missing values
+            self.fill_values = X.median()
+            X.fillna(self.fill_values, inplace=True)
+            
+            # Remove extreme outliers (late-career edge cases)
+            self.clip_bounds = {}
+            for col in X.columns:
+                Q1 = X[col].quantile(0.01)
+                Q3 = X[col].quantile(0.99)
+                X[col] = np.clip(X[col], Q1, Q3)
+                self.clip_bounds[col] = (Q1, Q3)
+        else:
+            raise ValueError(f"Unknown quantiles mode: {quantiles}")
+        
+        # Normalize features; StandardScaler keeps float32 input in float32
+        self.scaler = StandardScaler()
+        X_scaled = self.scaler.fit_transform(X.astype(self.feature_dtype, copy=False))
         
         self.X_scaled = X_scaled
         self.feature_names = career_features
@@ -109,94 +720,141 @@ class CareerProgressionAnalyzer:
         print(f"Data preprocessing completed. Using {len(career_features)} features for clustering.")
         return X_scaled
     
-    def find_optimal_clusters(self, max_clusters=10):
+    @instrumented_stage('find_optimal_clusters')
+    def find_optimal_clusters(self, max_clusters=10, n_jobs=None, silhouette_method='exact',
+                              silhouette_sample_size=10000, plot=True):
         """Find optimal number of clusters using elbow method and silhouette score"""
-        inertias = []
-        silhouette_scores = []
+        k_values = list(range(2, max_clusters + 1))
         
-        for k in range(2, max_clusters + 1):
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            cluster_labels = kmeans.fit_predict(self.X_scaled)
-            inertias.append(kmeans.inertia_)
-            silhouette_scores.append(silhouette_score(self.X_scaled, cluster_labels))
+        # Candidate k values run in parallel workers; joblib memory-maps X_scaled
+        # so every worker reads the same copy of the data
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_evaluate_k)(self.X_scaled, k, silhouette_method, silhouette_sample_size)
+            for k in k_values
+        )
+        inertias = [inertia for inertia, _, _ in results]
+        silhouette_scores = [score for _, score, _ in results]
+        silhouette_errors = [error for _, _, error in results]
+        
+        self.k_sweep_results = pd.DataFrame({
+            'k': k_values,
+            'inertia': inertias,
+            'silhouette': silhouette_scores,
+            'silhouette_error': silhouette_errors
+        })
         
         # Find optimal k based on silhouette score
         optimal_k = np.argmax(silhouette_scores) + 2
         
         # Plot results
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
-        
-        ax1.plot(range(2, max_clusters + 1), inertias, 'bo-')
-        ax1.set_xlabel('Number of clusters')
-        ax1.set_ylabel('Inertia')
-        ax1.set_title('Elbow Method')
-        ax1.grid(True)
-        
-        ax2.plot(range(2, max_clusters + 1), silhouette_scores, 'ro-')
-        ax2.set_xlabel('Number of clusters')
-        ax2.set_ylabel('Silhouette Score')
-        ax2.set_title('Silhouette Score Analysis')
-        ax2.grid(True)
-        
-        plt.tight_layout()
-        plt.savefig('d:/UFO PROJECTS/Second Project/cluster_analysis.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        if plot:
+            # Plotting libraries load only when a plot is requested
+            import matplotlib.pyplot as plt
+            
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
+            
+            ax1.plot(range(2, max_clusters + 1), inertias, 'bo-')
+            ax1.set_xlabel('Number of clusters')
+            ax1.set_ylabel('Inertia')
+            ax1.set_title('Elbow Method')
+            ax1.grid(True)
+            
+            ax2.plot(range(2, max_clusters + 1), silhouette_scores, 'ro-')
+            ax2.set_xlabel('Number of clusters')
+            ax2.set_ylabel('Silhouette Score')
+            ax2.set_title('Silhouette Score Analysis')
+            ax2.grid(True)
+            
+            plt.tight_layout()
+            plt.savefig('d:/UFO PROJECTS/Second Project/cluster_analysis.png', dpi=300, bbox_inches='tight')
+            plt.show()
         
         print(f"Optimal number of clusters: {optimal_k}")
-        print(f"Silhouette score: {silhouette_scores[optimal_k-2]:.3f}")
+        print(f"Silhouette score: {silhouette_scores[optimal_k-2]:.3f} (±{silhouette_errors[optimal_k-2]:.3f})")
         
         return optimal_k
     
-    def perform_clustering(self, n_clusters=5):
-        """Perform K-means clustering"""
-        self.kmeans_model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        self.clusters = self.kmeans_model.fit_predict(self.X_scaled)
+    @instrumented_stage('perform_clustering')
+    def perform_clustering(self, n_clusters=5, method='kmeans', batch_size=4096, max_epochs=3,
+                           init_size=100_000, silhouette_method=None, silhouette_sample_size=10000):
+        """Perform K-means clustering
+        
+        method='minibatch' streams X_scaled through MiniBatchKMeans.partial_fit in
+        fixed-size batches, so memory stays bounded and update_clusters() can fold
+        new employees into the centroids later without a full refit.
+        """
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+        
+        if method == 'kmeans':
+            self.kmeans_model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            self.clusters = self.kmeans_model.fit_predict(self.X_scaled)
+        elif method == 'minibatch':
+            # Seed the centroids with a full k-means fit on a bounded random sample,
+            # since partial_fit would otherwise initialize from the first batch alone
+            rng = np.random.default_rng(42)
+            init_rows = np.sort(rng.choice(len(self.X_scaled), size=min(init_size, len(self.X_scaled)),
+                                           replace=False))
+            seed_model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            seed_model.fit(self.X_scaled[init_rows])
+            
+            self.kmeans_model = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, batch_size=batch_size,
+                                                init=seed_model.cluster_centers_, n_init=1)
+            starts = np.arange(0, len(self.X_scaled), batch_size)
+            
+            # Visit contiguous batches in a shuffled order each epoch
+            for _ in range(max_epochs):
+                for start in rng.permutation(starts):
+                    self.kmeans_model.partial_fit(self.X_scaled[start:start + batch_size])
+            
+            self.clusters = self._predict_in_batches(self.X_scaled, batch_size)
+        else:
+            raise ValueError(f"Unknown clustering method: {method}")
         
         # Add cluster labels to dataframe
         self.processed_df['CareerCluster'] = self.clusters
         
-        silhouette_avg = silhouette_score(self.X_scaled, self.clusters)
-        print(f"Clustering completed with silhouette score: {silhouette_avg:.3f}")
+        # Exact silhouette is O(n^2); the streaming backend defaults to a sampled estimate
+        if silhouette_method is None:
+            silhouette_method = 'exact' if method == 'kmeans' else 'sampled'
+        silhouette_avg, silhouette_error = estimate_silhouette(
+            self.X_scaled, self.clusters, self.kmeans_model.cluster_centers_,
+            silhouette_method, silhouette_sample_size)
+        self.silhouette_avg = silhouette_avg
+        print(f"Clustering completed with silhouette score: {silhouette_avg:.3f}"
+              + (f" (±{silhouette_error:.3f})" if silhouette_error else ""))
         
         return self.clusters
     
-    def interpret_clusters(self):
-        """Analyze and label clusters based on career patterns"""
-        cluster_analysis = {}
+    def _predict_in_batches(self, X, batch_size):
+        """Assign clusters batch by batch to keep distance matrices small"""
+        return np.concatenate([
+            self.kmeans_model.predict(X[start:start + batch_size])
+            for start in range(0, len(X), batch_size)
+        ])
+    
+    def update_clusters(self, X_batch):
+        """Fold a batch of scaled employee features into the existing centroids"""
+        from sklearn.cluster import MiniBatchKMeans
         
-        for cluster_id in range(len(np.unique(self.clusters))):
-            cluster_data = self.processed_df[self.processed_df['CareerCluster'] == cluster_id]
-            
-            analysis = {
-                'size': len(cluster_data),
-                'avg_age': cluster_data['Age'].mean(),
-                'avg_job_level': cluster_data['JobLevel'].mean(),
-                'avg_years_at_company': cluster_data['YearsAtCompany'].mean(),
-                'avg_promotion_gap_ratio': cluster_data['PromotionGapRatio'].mean(),
-                'avg_role_stagnation': cluster_data['RoleStagnationIndex'].mean(),
-                'avg_training_intensity': cluster_data['TrainingIntensityScore'].mean(),
-                'avg_career_velocity': cluster_data['CareerVelocityScore'].mean(),
-                'attrition_rate': cluster_data['Attrition'].mean() * 100,
-                'avg_income': cluster_data['MonthlyIncome'].mean()
-            }
-            
-            cluster_analysis[cluster_id] = analysis
+        if not isinstance(self.kmeans_model, MiniBatchKMeans):
+            raise ValueError("update_clusters requires perform_clustering(method='minibatch')")
         
-        # Create cluster labels based on patterns
-        cluster_labels = {}
-        for cluster_id, analysis in cluster_analysis.items():
-            if analysis['avg_career_velocity'] > 0.5 and analysis['avg_promotion_gap_ratio'] < 0.3:
-                cluster_labels[cluster_id] = "Fast-Track Performers"
-            elif analysis['avg_years_at_company'] > 10 and analysis['avg_role_stagnation'] < 0.4:
-                cluster_labels[cluster_id] = "Stable Long-Term Contributors"
-            elif analysis['avg_years_at_company'] < 3:
-                cluster_labels[cluster_id] = "Early-Career Explorers"
-            elif analysis['avg_promotion_gap_ratio'] > 0.6 and analysis['avg_role_stagnation'] > 0.6:
-                cluster_labels[cluster_id] = "High-Risk Stagnation Profiles"
-            elif analysis['avg_promotion_gap_ratio'] > 0.4:
-                cluster_labels[cluster_id] = "Promotion-Stalled Employees"
-            else:
-                cluster_labels[cluster_id] = "Career Development Candidates"
+        X_batch = np.asarray(X_batch, dtype=self.kmeans_model.cluster_centers_.dtype)
+        self.kmeans_model.partial_fit(X_batch)
+        return self.kmeans_model.predict(X_batch)
+    
+    @instrumented_stage('build_peer_index')
+    def build_peer_index(self, leafsize=16, eps=0.0):
+        """Index X_scaled for "employees like this one" queries, one tree per attrition value"""
+        self.peer_index = PeerIndex.from_analyzer(self, leafsize=leafsize, eps=eps)
+        print(f"Peer index built over {self.peer_index.n_rows} employees")
+        return self.peer_index
+    
+    @instrumented_stage('interpret_clusters')
+    def interpret_clusters(self):
+        """Analyze and label clusters based on career patterns"""
+        # Every per-cluster statistic comes from one grouped pass
+        cluster_analysis, cluster_labels = summarize_clusters(WorkforceSummary(self.processed_df))
         
         self.cluster_analysis = cluster_analysis
         self.cluster_labels = cluster_labels
@@ -217,60 +875,17 @@ class CareerProgressionAnalyzer:
         
         return cluster_analysis, cluster_labels
     
+    @instrumented_stage('calculate_promotion_gap_risk_score')
     def calculate_promotion_gap_risk_score(self):
         """Calculate promotion gap risk score for each employee"""
-        df = self.processed_df.copy()
-        
-        # Define risk scoring criteria
-        def calculate_risk(row):
-            risk_score = 0
-            
-            # High promotion gap ratio
-            if row['PromotionGapRatio'] > 0.6:
-                risk_score += 3
-            elif row['PromotionGapRatio'] > 0.4:
-                risk_score += 2
-            elif row['PromotionGapRatio'] > 0.2:
-                risk_score += 1
-            
-            # High role stagnation
-            if row['RoleStagnationIndex'] > 0.7:
-                risk_score += 3
-            elif row['RoleStagnationIndex'] > 0.5:
-                risk_score += 2
-            elif row['RoleStagnationIndex'] > 0.3:
-                risk_score += 1
-            
-            # Low training intensity
-            if row['TrainingIntensityScore'] < 0.1:
-                risk_score += 2
-            elif row['TrainingIntensityScore'] < 0.2:
-                risk_score += 1
-            
-            # Low career velocity
-            if row['CareerVelocityScore'] < 0.1:
-                risk_score += 2
-            elif row['CareerVelocityScore'] < 0.2:
-                risk_score += 1
-            
-            # Manager instability
-            if row['ManagerStabilityIndicator'] < 0.3:
-                risk_score += 1
-            
-            return risk_score
+        self._require_derived([feature for feature, _, _ in RISK_SCORING_CRITERIA])
+        df = self._stage_frame(self.processed_df)
         
-        df['PromotionGapRiskScore'] = df.apply(calculate_risk, axis=1)
+        # Score every employee against the declarative criteria table
+        df['PromotionGapRiskScore'] = score_promotion_gap_risk(df)
         
         # Categorize risk levels
-        def categorize_risk(score):
-            if score >= 7:
-                return "High"
-            elif score >= 4:
-                return "Medium"
-            else:
-                return "Low"
-        
-        df['PromotionGapRiskLevel'] = df['PromotionGapRiskScore'].apply(categorize_risk)
+        df['PromotionGapRiskLevel'] = categorize_risk_levels(df['PromotionGapRiskScore'])
         
         self.processed_df = df
         
@@ -283,28 +898,14 @@ class CareerProgressionAnalyzer:
         
         return df
     
+    @instrumented_stage('identify_retention_opportunities')
     def identify_retention_opportunities(self):
         """Identify employees who need career intervention"""
-        df = self.processed_df.copy()
-        
-        # Define retention opportunity criteria
-        retention_opportunities = df[
-            (df['Attrition'] == 0) &  # Not yet disengaged
-            (df['PromotionGapRiskLevel'].isin(['Medium', 'High'])) &  # Show career stagnation signals
-            (df['JobSatisfaction'] >= 3) &  # Still satisfied with job
-            (df['EnvironmentSatisfaction'] >= 3)  # Satisfied with environment
-        ].copy()
-        
-        # Calculate retention opportunity index
-        retention_opportunities['RetentionOpportunityIndex'] = (
-            retention_opportunities['PromotionGapRiskScore'] * 0.4 +
-            (5 - retention_opportunities['JobSatisfaction']) * 0.2 +
-            (5 - retention_opportunities['EnvironmentSatisfaction']) * 0.2 +
-            retention_opportunities['RoleStagnationIndex'] * 10 * 0.2
-        )
+        self._require_derived(['RoleStagnationIndex'])
         
-        # Sort by priority
-        retention_opportunities = retention_opportunities.sort_values('RetentionOpportunityIndex', ascending=False)
+        # Rank the candidates by retention opportunity index
+        self.retention_ranking = RetentionRanking(self.processed_df)
+        retention_opportunities = self.retention_ranking.frame()
         
         self.retention_opportunities = retention_opportunities
         
@@ -312,66 +913,43 @@ class CareerProgressionAnalyzer:
         print(f"Identified {len(retention_opportunities)} employees for career intervention")
         print(f"Top 10 high-priority employees:")
         
-        top_10 = retention_opportunities.head(10)
+        top_10 = self.retention_ranking.top(10)
         for idx, row in top_10.iterrows():
             print(f"  Employee {idx}: Risk Score {row['PromotionGapRiskScore']}, "
                   f"Opportunity Index {row['RetentionOpportunityIndex']:.2f}")
         
         return retention_opportunities
     
+    @instrumented_stage('generate_insights')
     def generate_insights(self):
         """Generate key insights for stakeholders"""
-        insights = []
-        
-        # Cluster insights
-        cluster_sizes = self.processed_df['CareerCluster'].value_counts()
-        largest_cluster = cluster_sizes.index[0]
-        largest_cluster_label = self.cluster_labels[largest_cluster]
-        
-        insights.append(f"The largest career group is '{largest_cluster_label}' with "
-                       f"{cluster_sizes.iloc[0]} employees ({cluster_sizes.iloc[0]/len(self.processed_df)*100:.1f}%)")
-        
-        # Risk insights
-        high_risk_count = len(self.processed_df[self.processed_df['PromotionGapRiskLevel'] == 'High'])
-        insights.append(f"{high_risk_count} employees ({high_risk_count/len(self.processed_df)*100:.1f}%) "
-                       "are at high risk of promotion stagnation")
-        
-        # Retention opportunities
-        insights.append(f"{len(self.retention_opportunities)} employees show retention opportunities "
-                       "through career intervention")
-        
-        # Department insights
-        dept_risk = self.processed_df.groupby('Department')['PromotionGapRiskScore'].mean().sort_values(ascending=False)
-        highest_risk_dept = dept_risk.index[0]
-        insights.append(f"The '{highest_risk_dept}' department shows the highest average promotion gap risk")
-        
-        # Training insights
-        low_training = len(self.processed_df[self.processed_df['TrainingIntensityScore'] < 0.1])
-        insights.append(f"{low_training} employees ({low_training/len(self.processed_df)*100:.1f}%) "
-                       "have very low training intensity")
-        
-        return insights
+        return workforce_insights(WorkforceSummary(self.processed_df), self.cluster_labels,
+                                  len(self.retention_opportunities))
     
-    def save_results(self):
+    @instrumented_stage('save_results')
+    def save_results(self, output_dir='d:/UFO PROJECTS/Second Project'):
         """Save analysis results"""
+        os.makedirs(output_dir, exist_ok=True)
+        
         # Save processed dataframe
-        self.processed_df.to_csv('d:/UFO PROJECTS/Second Project/career_progression_results.csv', index=False)
+        self.processed_df.to_csv(os.path.join(output_dir, 'career_progression_results.csv'), index=False)
         
         # Save cluster analysis
         cluster_df = pd.DataFrame(self.cluster_analysis).T
         cluster_df['ClusterLabel'] = cluster_df.index.map(self.cluster_labels)
-        cluster_df.to_csv('d:/UFO PROJECTS/Second Project/cluster_analysis.csv')
+        cluster_df.to_csv(os.path.join(output_dir, 'cluster_analysis.csv'))
         
         # Save retention opportunities
         if hasattr(self, 'retention_opportunities'):
-            self.retention_opportunities.to_csv('d:/UFO PROJECTS/Second Project/retention_opportunities.csv', index=False)
+            self.retention_opportunities.to_csv(os.path.join(output_dir, 'retention_opportunities.csv'), index=False)
         
         print("Results saved to CSV files")
 
 # Main execution
 if __name__ == "__main__":
-    # Initialize analyzer
-    analyzer = CareerProgressionAnalyzer('d:/UFO PROJECTS/Second Project/Palo Alto Networks.csv')
+    # Initialize analyzer with stage instrumentation written as JSON lines
+    profiler = StageProfiler(sinks=[JsonLinesSink('d:/UFO PROJECTS/Second Project/pipeline_events.jsonl')])
+    analyzer = CareerProgressionAnalyzer('d:/UFO PROJECTS/Second Project/Palo Alto Networks.csv', profiler=profiler)
     
     # Load data
     analyzer.load_data()
@@ -383,7 +961,7 @@ if __name__ == "__main__":
     analyzer.preprocess_data()
     
     # Find optimal clusters
-    optimal_k = analyzer.find_optimal_clusters()
+    optimal_k = analyzer.find_optimal_clusters(n_jobs=-1)
     
     # Perform clustering
     analyzer.perform_clustering(optimal_k)
@@ -391,6 +969,9 @@ if __name__ == "__main__":
     # Interpret clusters
     analyzer.interpret_clusters()
     
+    # Index employees for similar-peer lookups
+    analyzer.build_peer_index()
+    
     # Calculate promotion gap risk scores
     analyzer.calculate_promotion_gap_risk_score()
     
@@ -406,3 +987,6 @@ if __name__ == "__main__":
     
     # Save results
     analyzer.save_results()
+    
+    print("\n=== PIPELINE STAGE TIMINGS ===")
+    print(profiler.format_breakdown())
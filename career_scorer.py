@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import joblib
+from career_progression_analysis import (
+    DERIVED_FEATURES,
+    RISK_SCORING_CRITERIA,
+    calculate_retention_opportunity_index,
+    categorize_risk_levels,
+    engineer_features,
+    retention_opportunity_mask,
+    score_promotion_gap_risk,
+)
+
+# Bump when the saved state changes shape; load() refuses other versions
+ARTIFACT_VERSION = 2
+
+# Fitted state captured from a CareerProgressionAnalyzer run
+ARTIFACT_FIELDS = ['scaler', 'le_dict', 'kmeans_model', 'feature_names',
+                   'fill_values', 'clip_bounds', 'cluster_labels', 'peer_index']
+
+# Fields an analyzer may not have produced
+OPTIONAL_FIELDS = ['cluster_labels', 'peer_index']
+
+class CareerProgressionScorer:
+    def __init__(self, scaler, le_dict, kmeans_model, feature_names, fill_values, clip_bounds,
+                 cluster_labels=None, peer_index=None):
+        """Initialize a scorer from fitted pipeline state"""
+        self.scaler = scaler
+        self.le_dict = le_dict
+        self.kmeans_model = kmeans_model
+        self.feature_names = list(feature_names)
+        self.fill_values = pd.Series(fill_values, dtype=np.float64)
+        self.clip_bounds = clip_bounds
+        self.cluster_labels = cluster_labels or {}
+        self.peer_index = peer_index
+
+        # Clip bounds as aligned vectors so clipping is one vectorized call
+        self.lower_bounds = pd.Series({col: clip_bounds[col][0] for col in self.feature_names})
+        self.upper_bounds = pd.Series({col: clip_bounds[col][1] for col in self.feature_names})
+
+        # Derived features the model, risk rules and retention index cannot do without
+        required = set(self.feature_names) | {feature for feature, _, _ in RISK_SCORING_CRITERIA}
+        self.required_features = [name for name in DERIVED_FEATURES
+                                  if name in required or name == 'RoleStagnationIndex']
+
+    @classmethod
+    def from_analyzer(cls, analyzer):
+        """Capture the fitted state of an analyzer that has run preprocessing and clustering"""
+        missing = [name for name in ARTIFACT_FIELDS
+                   if name not in OPTIONAL_FIELDS and getattr(analyzer, name, None) is None]
+        if missing:
+            raise ValueError(f"Analyzer has not been fitted yet; missing {missing}")
+        return cls(**{name: getattr(analyzer, name, None) for name in ARTIFACT_FIELDS})
+
+    def save(self, path):
+        """Write the fitted state as a versioned joblib artifact"""
+        state = {name: getattr(self, name) for name in ARTIFACT_FIELDS}
+        joblib.dump({'artifact_version': ARTIFACT_VERSION, 'state': state}, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a scorer saved by save()"""
+        artifact = joblib.load(path)
+        version = artifact.get('artifact_version')
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported artifact version {version}; expected {ARTIFACT_VERSION}")
+        return cls(**artifact['state'])
+
+    def transform(self, df):
+        """Build the scaled clustering matrix for engineered rows using the saved state"""
+        columns = {}
+        for name in self.feature_names:
+            if name.endswith('_Encoded'):
+                # Categories unseen during fitting map to -1, then get the fitted fill value
+                source = name[:-len('_Encoded')]
+                codes = pd.Categorical(df[source].astype(str), categories=self.le_dict[source].classes_).codes
+                columns[name] = np.where(codes >= 0, codes, np.nan)
+            else:
+                columns[name] = df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        X = pd.DataFrame(columns, index=df.index)
+        X = X.fillna(self.fill_values)
+        X = X.clip(lower=self.lower_bounds, upper=self.upper_bounds, axis=1)
+        return self.scaler.transform(X)
+
+    def score(self, df, features=None):
+        """Score a batch of raw employee rows without refitting anything
+
+        features limits the derived metrics computed beyond the ones scoring
+        itself needs; by default all of them are returned.
+        """
+        requested = DERIVED_FEATURES if features is None else features
+        needed = [name for name in DERIVED_FEATURES if name in requested or name in self.required_features]
+        scored = engineer_features(df.copy(), needed)
+
+        # Match the centroid precision so compact (float32) models predict directly
+        X = self.transform(scored).astype(self.kmeans_model.cluster_centers_.dtype, copy=False)
+        scored['CareerCluster'] = self.kmeans_model.predict(X)
+        if self.cluster_labels:
+            scored['CareerClusterLabel'] = scored['CareerCluster'].map(self.cluster_labels)
+
+        scored['PromotionGapRiskScore'] = score_promotion_gap_risk(scored)
+        scored['PromotionGapRiskLevel'] = categorize_risk_levels(scored['PromotionGapRiskScore'])
+
+        # The index is reported for every row; the flag marks actual retention candidates
+        scored['RetentionOpportunity'] = retention_opportunity_mask(scored)
+        scored['RetentionOpportunityIndex'] = calculate_retention_opportunity_index(scored)
+        return scored
+
+    def peers(self, df, k=5, group=None, eps=None):
+        """Distances and positions of the k fitted employees most like each raw row
+
+        group limits the peers to one attrition value (0 stayed, 1 left).
+        Positions index the rows the scorer's analyzer was fitted on.
+        """
+        if self.peer_index is None:
+            raise ValueError("This scorer was saved without a peer index; run build_peer_index() first")
+        # Only the derived metrics the clustering matrix uses, as score() would build them
+        needed = [name for name in DERIVED_FEATURES if name in self.feature_names]
+        X = self.transform(engineer_features(df.copy(), needed))
+        return self.peer_index.query(X, k, group, eps)
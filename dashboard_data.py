@@ -0,0 +1,323 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from career_progression_analysis import RetentionRanking, WorkforceSummary, retention_opportunity_mask
+from interventions import counts_from_histogram, code_histogram, intervention_codes
+
+# Career stage buckets offered by the dashboard: (min years, max years) at the company
+CAREER_STAGES = {
+    'Early Career (0-3 years)': (None, 3),
+    'Mid Career (4-7 years)': (4, 7),
+    'Senior Career (8+ years)': (8, None),
+}
+
+def career_stage_labels(years_at_company):
+    """Label each row with its career stage, or None when it falls in no bucket"""
+    years = np.asarray(years_at_company, dtype=np.float64)
+    conditions = []
+    for low, high in CAREER_STAGES.values():
+        condition = np.ones(len(years), dtype=bool)
+        if low is not None:
+            condition &= years >= low
+        if high is not None:
+            condition &= years <= high
+        conditions.append(condition)
+    labels = np.array(list(CAREER_STAGES) + [None], dtype=object)
+    return labels[np.select(conditions, np.arange(len(CAREER_STAGES)), default=len(CAREER_STAGES))]
+
+class FilterIndex:
+    # Sidebar filter dimensions mapped to the column holding their values
+    DIMENSIONS = {
+        'dept': 'Department',
+        'role': 'JobRole',
+        'stage': None,  # derived from YearsAtCompany
+        'risk': 'PromotionGapRiskLevel',
+    }
+
+    def __init__(self, df):
+        """Build per-value row-id indexes for the dashboard filter dimensions"""
+        self.df = df
+        self.codes = {}
+        self.values = {}
+        self.rows = {}
+
+        for dimension, column in self.DIMENSIONS.items():
+            source = career_stage_labels(df['YearsAtCompany']) if column is None else df[column]
+            codes, uniques = pd.factorize(source)
+            codes = codes.astype(np.int32)
+
+            # One stable argsort groups row ids by value while keeping each group sorted
+            order = np.argsort(codes, kind='stable').astype(np.int64)
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            offset = np.count_nonzero(codes < 0)
+            bounds = offset + np.concatenate([[0], np.cumsum(counts)])
+
+            self.codes[dimension] = codes
+            self.values[dimension] = list(uniques)
+            self.rows[dimension] = {value: order[bounds[i]:bounds[i + 1]]
+                                    for i, value in enumerate(uniques)}
+
+    def options(self, dimension):
+        """Distinct values of a dimension in order of first appearance"""
+        return self.values[dimension]
+
+    def row_ids(self, dept='All', role='All', stage='All', risk='All'):
+        """Row positions matching the selection, or None when nothing is filtered"""
+        selection = {'dept': dept, 'role': role, 'stage': stage, 'risk': risk}
+        active = {dim: value for dim, value in selection.items() if value != 'All'}
+        if not active:
+            return None
+
+        # Start from the smallest posting list and check the remaining
+        # dimensions by code lookup, so the cost scales with the selection size
+        empty = np.array([], dtype=np.int64)
+        postings = {dim: self.rows[dim].get(value, empty) for dim, value in active.items()}
+        smallest = min(postings, key=lambda dim: len(postings[dim]))
+        rows = postings[smallest]
+
+        for dim, value in active.items():
+            if dim == smallest or len(rows) == 0:
+                continue
+            code = self.values[dim].index(value)
+            rows = rows[self.codes[dim][rows] == code]
+        return rows
+
+    def filter(self, dept='All', role='All', stage='All', risk='All'):
+        """Return the rows matching the sidebar selection without copying the full frame"""
+        rows = self.row_ids(dept, role, stage, risk)
+        if rows is None:
+            return self.df
+        return self.df.iloc[rows]
+
+class ThresholdExplorer:
+    def __init__(self, values, outcome):
+        """Presort a metric's distinct values with cumulative row and outcome sums
+        
+        Any threshold split or band breakdown is then a binary search over the
+        distinct values, independent of how many rows were summarized. Rows
+        with a null metric fall in no band, as in a boolean filter.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        outcome = np.asarray(outcome, dtype=np.float64)
+        self.rows = len(values)
+        present = ~np.isnan(values)
+        self.values, inverse = np.unique(values[present], return_inverse=True)
+        
+        outcome = outcome[present]
+        known = ~np.isnan(outcome)
+        size = len(self.values)
+        self.cum_rows = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=size))])
+        self.cum_known = np.concatenate([[0], np.cumsum(np.bincount(inverse, weights=known, minlength=size))])
+        self.cum_outcome = np.concatenate([[0.0], np.cumsum(
+            np.bincount(inverse, weights=np.where(known, outcome, 0.0), minlength=size))])
+    
+    def _band(self, start, stop):
+        """Row count and mean outcome for distinct values [start, stop)"""
+        known = self.cum_known[stop] - self.cum_known[start]
+        mean = (self.cum_outcome[stop] - self.cum_outcome[start]) / known if known else np.nan
+        return int(self.cum_rows[stop] - self.cum_rows[start]), mean
+    
+    def split(self, threshold):
+        """Rows and mean outcome below and at or above a threshold"""
+        cut = int(np.searchsorted(self.values, threshold, side='left'))
+        below, below_mean = self._band(0, cut)
+        above, above_mean = self._band(cut, len(self.values))
+        return {'below': below, 'below_mean': below_mean, 'above': above, 'above_mean': above_mean}
+    
+    def bands(self, cutoffs, default):
+        """Rows and mean outcome per level for (minimum, level) cutoffs, highest first"""
+        records = []
+        stop = len(self.values)
+        for minimum, level in cutoffs:
+            # Rows already claimed by a higher level never fall into a lower one
+            start = min(int(np.searchsorted(self.values, minimum, side='left')), stop)
+            records.append((level, *self._band(start, stop)))
+            stop = start
+        records.append((default, *self._band(0, stop)))
+        return pd.DataFrame(records, columns=['Level', 'Employees', 'Mean Outcome']).set_index('Level')
+
+class AggregateCache:
+    # Metrics averaged by the dashboard tabs
+    MEASURES = ['PromotionGapRatio', 'RoleStagnationIndex', 'CareerVelocityScore', 'TrainingIntensityScore',
+                'YearsSinceLastPromotion', 'YearsWithCurrManager', 'Attrition', 'JobSatisfaction',
+                'EnvironmentSatisfaction', 'PerformanceRating']
+
+    # Cube dimensions beyond the filter codes; the tabs group by these
+    GROUP_KEYS = ['CareerCluster', 'ManagerTenure']
+
+    def __init__(self, filter_index, maxsize=128):
+        """Pre-aggregate sums and counts over the filter dimensions and tab groupings"""
+        self.filter_index = filter_index
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        df = filter_index.df
+        keys = pd.DataFrame({dim: filter_index.codes[dim] for dim in FilterIndex.DIMENSIONS})
+        keys['CareerCluster'] = df['CareerCluster'].to_numpy()
+        keys['ManagerTenure'] = df['YearsWithCurrManager'].to_numpy()
+        group_keys = list(FilterIndex.DIMENSIONS) + self.GROUP_KEYS
+
+        # One grouped pass over the rows; everything after this touches only the cube
+        measures = pd.DataFrame({col: df[col].to_numpy(dtype=np.float64) for col in self.MEASURES})
+        grouped = pd.concat([keys, measures], axis=1).groupby(group_keys, dropna=False, sort=False)
+        sums = grouped[self.MEASURES].sum()
+        counts = grouped[self.MEASURES].count()
+        sums.columns = [f'{col}_sum' for col in self.MEASURES]
+        counts.columns = [f'{col}_count' for col in self.MEASURES]
+        self.cube = pd.concat([sums, counts], axis=1).reset_index()
+        
+        # Retention candidates over the shared frame; each selection ranks its own share of them
+        self.candidates = retention_opportunity_mask(df).to_numpy(dtype=bool)
+
+    def stats(self):
+        """Hit/miss counters and current size of the memo"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'maxsize': self.maxsize}
+
+    def get(self, dept='All', role='All', stage='All', risk='All'):
+        """Return the tab aggregates for a filter selection, memoized in a bounded LRU"""
+        key = (dept, role, stage, risk)
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+
+        aggregates = self._compute(dict(zip(FilterIndex.DIMENSIONS, key)))
+        with self.lock:
+            self.entries[key] = aggregates
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return aggregates
+
+    def _slice(self, selection):
+        """Cube rows matching the filter selection"""
+        mask = np.ones(len(self.cube), dtype=bool)
+        for dim, value in selection.items():
+            if value == 'All':
+                continue
+            values = self.filter_index.values[dim]
+            code = values.index(value) if value in values else -2
+            mask &= self.cube[dim].to_numpy() == code
+        return self.cube[mask]
+
+    def _means(self, cube, by, columns):
+        """Re-aggregate cube cells into group means of the given measures"""
+        grouped = cube.groupby(by)[[f'{col}_sum' for col in columns] + [f'{col}_count' for col in columns]].sum()
+        return pd.DataFrame({col: grouped[f'{col}_sum'] / grouped[f'{col}_count'] for col in columns})
+
+    def _compute(self, selection):
+        """Build every tab aggregate for one filter selection from the cube"""
+        cube = self._slice(selection)
+        # Cells with a missing department or role drop out, as they would in a groupby
+        known_role = cube[cube['role'] >= 0]
+        known_team = known_role[known_role['dept'] >= 0]
+        role_names = np.array(self.filter_index.values['role'], dtype=object)
+        dept_names = np.array(self.filter_index.values['dept'], dtype=object)
+
+        cluster_comparison = self._means(cube, 'CareerCluster', [
+            'PromotionGapRatio', 'RoleStagnationIndex', 'CareerVelocityScore', 'TrainingIntensityScore'
+        ]).reset_index()
+
+        role_stagnation = self._means(known_role, 'role', [
+            'PromotionGapRatio', 'RoleStagnationIndex', 'YearsSinceLastPromotion', 'Attrition'
+        ])
+        role_stagnation.index = pd.Index(role_names[role_stagnation.index], name='JobRole')
+        role_stagnation = role_stagnation.sort_index().round(3)
+        role_stagnation.columns = ['Avg Promotion Gap', 'Avg Role Stagnation', 'Avg Years Since Promotion', 'Attrition Rate']
+        role_stagnation = role_stagnation.sort_values('Avg Promotion Gap', ascending=False)
+
+        manager_impact = self._means(cube, 'ManagerTenure', [
+            'PromotionGapRatio', 'CareerVelocityScore', 'Attrition', 'JobSatisfaction'
+        ]).round(3)
+        manager_impact.index.name = 'YearsWithCurrManager'
+        manager_impact.columns = ['Avg Promotion Gap', 'Avg Career Velocity', 'Attrition Rate', 'Avg Job Satisfaction']
+
+        team_analysis = self._means(known_team, ['dept', 'role'], [
+            'PromotionGapRatio', 'RoleStagnationIndex', 'Attrition', 'YearsWithCurrManager'
+        ])
+        teams = [f'{dept_names[d]} - {role_names[r]}' for d, r in team_analysis.index]
+        team_analysis.index = pd.Index(teams, name='Team')
+        team_analysis = team_analysis.sort_index().round(3)
+        team_analysis.columns = ['Avg Promotion Gap', 'Avg Role Stagnation', 'Attrition Rate', 'Avg Manager Tenure']
+
+        # Identify high-risk teams
+        team_analysis['RiskScore'] = (
+            team_analysis['Avg Promotion Gap'] * 0.4 +
+            team_analysis['Avg Role Stagnation'] * 0.3 +
+            team_analysis['Attrition Rate'] * 0.3
+        )
+
+        manager_effectiveness = self._means(cube, 'ManagerTenure', [
+            'JobSatisfaction', 'EnvironmentSatisfaction', 'PerformanceRating'
+        ]).round(2)
+        manager_effectiveness.index.name = 'YearsWithCurrManager'
+        manager_effectiveness.columns = ['Avg Job Satisfaction', 'Avg Environment Satisfaction', 'Avg Performance Rating']
+
+        # Threshold explorers summarize the selected rows once per selection
+        rows = self.filter_index.row_ids(**selection)
+        def selected(col):
+            values = self.filter_index.df[col].to_numpy()
+            return values if rows is None else values[rows]
+        
+        # Row-level figures are built once per selection too, never per rerun
+        filtered = self.filter_index.filter(**selection)
+        if rows is None:
+            candidates = self.candidates
+        else:
+            candidates = np.zeros(len(self.candidates), dtype=bool)
+            candidates[rows] = self.candidates[rows]
+        
+        return {
+            'cluster_comparison': cluster_comparison,
+            'role_stagnation': role_stagnation,
+            'manager_impact': manager_impact,
+            'team_analysis': team_analysis,
+            'manager_effectiveness': manager_effectiveness,
+            'gap_threshold': ThresholdExplorer(selected('PromotionGapRatio'), selected('Attrition')),
+            'risk_cutoffs': ThresholdExplorer(selected('PromotionGapRiskScore'), selected('Attrition')),
+            'summary': WorkforceSummary(filtered),
+            # Ranked against the shared frame so the entry holds no copy of the selected rows
+            'retention_ranking': RetentionRanking(self.filter_index.df, candidates),
+            'intervention_counts': counts_from_histogram(code_histogram(intervention_codes(filtered))),
+        }
+
+def freeze_array(values):
+    """Mark an array read-only so shared readers cannot write through it"""
+    values = np.asarray(values)
+    values.setflags(write=False)
+    return values
+
+def freeze_frame(df):
+    """Rebuild a frame over read-only views of its column arrays without copying"""
+    if df is None:
+        return None
+    columns = {}
+    for name, series in df.items():
+        if isinstance(series.dtype, np.dtype):
+            columns[name] = freeze_array(series.to_numpy(copy=False))
+        else:
+            columns[name] = series.array
+    return pd.DataFrame(columns, index=df.index, columns=df.columns, copy=False)
+
+class SharedAnalysisStore:
+    def __init__(self, analyzer):
+        """Hold one read-only copy of the analysis results for every dashboard session"""
+        analyzer.processed_df = freeze_frame(analyzer.processed_df)
+        analyzer.retention_opportunities = freeze_frame(getattr(analyzer, 'retention_opportunities', None))
+        analyzer.X_scaled = freeze_array(analyzer.X_scaled)
+        analyzer.clusters = freeze_array(analyzer.clusters)
+
+        self.analyzer = analyzer
+        self.df = analyzer.processed_df
+        self.filter_index = FilterIndex(self.df)
+        self.aggregates = AggregateCache(self.filter_index)
+
+        for dimension in self.filter_index.codes:
+            freeze_array(self.filter_index.codes[dimension])
+            for rows in self.filter_index.rows[dimension].values():
+                freeze_array(rows)
@@ -0,0 +1,232 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from career_progression_analysis import (CareerProgressionAnalyzer, RetentionRanking, WorkforceSummary,
+                                         summarize_clusters, workforce_insights)
+from career_scorer import CareerProgressionScorer
+
+# A full refit runs once either drift measure crosses its threshold
+DRIFT_THRESHOLD = 0.25        # largest shift of a scaled feature mean, in fitted standard deviations
+MAX_CHANGED_FRACTION = 0.5    # rows re-scored or removed since the last fit, as a share of the fitted rows
+
+# Bump when the saved refresh state changes shape; load() refuses other versions
+STATE_VERSION = 1
+
+def row_hashes(df, key_column=None):
+    """64-bit content hash of every row except the key, indexed like df
+
+    Numeric columns are hashed as float64 so a column that gains a null
+    (and turns from int to float) does not make every row look changed.
+    """
+    combined = np.zeros(len(df), dtype=np.uint64)
+    for col in df.columns:
+        if col == key_column:
+            continue
+        if is_numeric_dtype(df[col]):
+            values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            values = df[col].to_numpy(dtype=object)
+        # Multiply-xor keeps the combined hash sensitive to column order; uint64 wraps around
+        combined = combined * np.uint64(1_000_003) ^ pd.util.hash_array(values)
+    return pd.Series(combined, index=df.index)
+
+def fit_scorer(df, n_clusters=3, method='kmeans'):
+    """Run the full pipeline on one snapshot frame and capture its fitted state"""
+    analyzer = CareerProgressionAnalyzer(None)
+    analyzer.df = df.reset_index(drop=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.feature_engineering()
+        analyzer.preprocess_data()
+        analyzer.perform_clustering(n_clusters, method=method, silhouette_method='sampled')
+        analyzer.interpret_clusters()
+    return CareerProgressionScorer.from_analyzer(analyzer)
+
+class IncrementalRefresh:
+    def __init__(self, scorer, key_column=None, drift_threshold=DRIFT_THRESHOLD,
+                 max_changed_fraction=MAX_CHANGED_FRACTION):
+        """Keep a scored workforce current by re-scoring only new and changed employees
+
+        Each snapshot is hashed row by row and matched to the previous one
+        on key_column (row position when there is none, which only suits
+        append-only extracts). New and changed rows are featurized and scored
+        against the saved model. The workforce summary cube, the retention
+        ranking and the running feature means are updated from the delta
+        alone. The model is refit once the scaled feature means drift past
+        drift_threshold or more than max_changed_fraction of the fitted rows
+        have been re-scored.
+        """
+        self.scorer = scorer
+        self.key_column = key_column
+        self.drift_threshold = drift_threshold
+        self.max_changed_fraction = max_changed_fraction
+        self.scored = None
+
+    def _keyed(self, df):
+        """Snapshot indexed by employee key"""
+        if self.key_column is None:
+            return df.set_axis(pd.RangeIndex(len(df)), axis=0)
+        keyed = df.set_index(df[self.key_column].rename(None))
+        if not keyed.index.is_unique:
+            raise ValueError(f"Duplicate {self.key_column} values in snapshot")
+        return keyed
+
+    def _feature_sums(self, scored):
+        """Column sums of the scaled model features of scored rows"""
+        if len(scored) == 0:
+            return np.zeros(len(self.scorer.feature_names))
+        return self.scorer.transform(scored).sum(axis=0, dtype=np.float64)
+
+    def baseline(self, df):
+        """Score every row of a snapshot and build the aggregates from scratch"""
+        df = self._keyed(df)
+        self.hashes = row_hashes(df, self.key_column)
+        self.scored = self.scorer.score(df)
+        self.summary = WorkforceSummary(self.scored)
+        self.ranking = RetentionRanking(self.scored)
+        self.feature_sums = self._feature_sums(self.scored)
+        self.fitted_rows = len(df)
+        self.changed_since_fit = 0
+        self.last_changes = self.scored
+        return self.scored
+
+    def drift(self):
+        """Current drift measures against the fitted model"""
+        rows = max(len(self.scored), 1)
+        return {
+            'mean_shift': float(np.abs(self.feature_sums / rows).max()),
+            'changed_fraction': self.changed_since_fit / max(self.fitted_rows, 1),
+        }
+
+    def refit(self, df, n_clusters=None):
+        """Fit a new model on a snapshot and rebuild every aggregate"""
+        n_clusters = n_clusters or self.scorer.kmeans_model.n_clusters
+        key_free = df.drop(columns=[self.key_column]) if self.key_column else df
+        self.scorer = fit_scorer(key_free, n_clusters)
+        return self.baseline(df)
+
+    def refresh(self, df):
+        """Apply a new snapshot; returns a report of what changed and whether the model was refit"""
+        if self.scored is None:
+            raise ValueError("Call baseline() with a first snapshot before refresh()")
+        start = time.perf_counter()
+        df = self._keyed(df)
+        hashes = row_hashes(df, self.key_column)
+
+        # Match employees to the previous snapshot on key, then compare hashes
+        previous = self.hashes.index.get_indexer(hashes.index)
+        is_new = previous < 0
+        is_changed = ~is_new & (self.hashes.to_numpy()[np.maximum(previous, 0)] != hashes.to_numpy())
+        new_keys = hashes.index[is_new]
+        changed_keys = hashes.index[is_changed]
+        removed_keys = self.hashes.index[~self.hashes.index.isin(hashes.index)]
+        delta_keys = hashes.index[is_new | is_changed]
+
+        rescored = self.scorer.score(df.loc[delta_keys]) if len(delta_keys) else self.scored.iloc[:0]
+        outgoing = self.scored.loc[changed_keys.append(removed_keys)]
+
+        # Take the old rows out of the running aggregates and add their replacements
+        self.summary = WorkforceSummary.combine(
+            [self.summary, WorkforceSummary(outgoing), WorkforceSummary(rescored)], signs=[1, -1, 1])
+        self.feature_sums = self.feature_sums - self._feature_sums(outgoing) + self._feature_sums(rescored)
+
+        if len(removed_keys):
+            kept = self.scored.drop(removed_keys)
+            self.ranking.drop(kept, removed_keys)
+            self.scored = kept
+        if len(changed_keys):
+            self.scored.loc[changed_keys, rescored.columns] = rescored.loc[changed_keys]
+        if len(new_keys):
+            self.scored = pd.concat([self.scored, rescored.loc[new_keys]])
+        self.ranking.update(self.scored, delta_keys)
+
+        self.hashes = hashes
+        self.changed_since_fit += len(delta_keys) + len(removed_keys)
+        self.last_changes = rescored
+
+        drift = self.drift()
+        refit = (drift['mean_shift'] > self.drift_threshold
+                 or drift['changed_fraction'] > self.max_changed_fraction)
+        if refit:
+            self.refit(df)
+
+        return {
+            'rows': len(df),
+            'new': len(new_keys),
+            'changed': len(changed_keys),
+            'removed': len(removed_keys),
+            'unchanged': len(df) - len(delta_keys),
+            **drift,
+            'refit': refit,
+            'seconds': time.perf_counter() - start,
+        }
+
+    def cluster_analysis(self):
+        """Per-cluster profile from the running summary"""
+        return summarize_clusters(self.summary)[0]
+
+    def insights(self):
+        """Key stakeholder insights from the running aggregates"""
+        return workforce_insights(self.summary, self.scorer.cluster_labels, len(self.ranking))
+
+    def save(self, path):
+        """Write the refresh state (model, scored rows, hashes and aggregates) for the next snapshot"""
+        state = {name: getattr(self, name) for name in
+                 ['scorer', 'key_column', 'drift_threshold', 'max_changed_fraction', 'scored', 'hashes',
+                  'summary', 'ranking', 'feature_sums', 'fitted_rows', 'changed_since_fit']}
+        joblib.dump({'state_version': STATE_VERSION, 'state': state}, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a refresh state saved by save()"""
+        saved = joblib.load(path)
+        version = saved.get('state_version')
+        if version != STATE_VERSION:
+            raise ValueError(f"Unsupported refresh state version {version}; expected {STATE_VERSION}")
+        state = saved['state']
+        refresher = cls(state.pop('scorer'), state.pop('key_column'), state.pop('drift_threshold'),
+                        state.pop('max_changed_fraction'))
+        refresher.__dict__.update(state)
+        return refresher
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh scored results from a new snapshot, re-scoring only changed rows")
+    parser.add_argument('snapshot', help="CSV extract for this period")
+    parser.add_argument('--state', default='refresh_state.joblib', help="Refresh state from the previous run")
+    parser.add_argument('--key', default=None, help="Employee identity column (default: row position)")
+    parser.add_argument('--clusters', type=int, default=3, help="Cluster count for the first fit")
+    parser.add_argument('--drift-threshold', type=float, default=DRIFT_THRESHOLD)
+    parser.add_argument('--max-changed-fraction', type=float, default=MAX_CHANGED_FRACTION)
+    parser.add_argument('--changes-output', default=None, help="Write the re-scored rows to this CSV")
+    args = parser.parse_args(argv)
+
+    snapshot = pd.read_csv(args.snapshot)
+    if os.path.exists(args.state):
+        refresher = IncrementalRefresh.load(args.state)
+        refresher.drift_threshold = args.drift_threshold
+        refresher.max_changed_fraction = args.max_changed_fraction
+        report = refresher.refresh(snapshot)
+        for key, value in report.items():
+            print(f"{key:<20}{value}")
+    else:
+        key_free = snapshot.drop(columns=[args.key]) if args.key else snapshot
+        refresher = IncrementalRefresh(fit_scorer(key_free, args.clusters), args.key, args.drift_threshold,
+                                       args.max_changed_fraction)
+        refresher.baseline(snapshot)
+        print(f"Baseline fitted and scored {len(snapshot)} employees")
+
+    for i, insight in enumerate(refresher.insights(), 1):
+        print(f"{i}. {insight}")
+    if args.changes_output:
+        refresher.last_changes.to_csv(args.changes_output)
+    refresher.save(args.state)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
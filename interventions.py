@@ -0,0 +1,139 @@
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from career_progression_analysis import COMPARISONS
+
+# Intervention rules: (action, feature, comparison, threshold, recommendation)
+# An employee is flagged for every rule their row satisfies
+INTERVENTION_RULES = [
+    ('Promotion Review', 'PromotionGapRatio', '>', 0.5,
+     "🎯 **Promotion Review**: Consider for advancement based on tenure and performance"),
+    ('Training Program', 'TrainingIntensityScore', '<', 0.2,
+     "📚 **Training Program**: Enroll in skill development programs to enhance capabilities"),
+    ('Role Rotation', 'RoleStagnationIndex', '>', 0.6,
+     "🔄 **Role Rotation**: Consider lateral move to new team or project"),
+    ('Manager Assignment', 'ManagerStabilityIndicator', '<', 0.3,
+     "👥 **Manager Assignment**: Review manager-employee fit and consider reassignment"),
+    ('Career Discussion', 'JobSatisfaction', '<', 4,
+     "💬 **Career Discussion**: Schedule career development conversation"),
+]
+
+def intervention_actions(rules=INTERVENTION_RULES):
+    """Action names in rule order"""
+    return [action for action, _, _, _, _ in rules]
+
+def evaluate_interventions(df, rules=INTERVENTION_RULES):
+    """Boolean flag matrix (rows x rules) for every employee in one vectorized pass"""
+    flags = np.empty((len(df), len(rules)), dtype=bool)
+    for i, (_, feature, comparison, threshold, _) in enumerate(rules):
+        # Null features compare False, as the per-employee checks did
+        values = df[feature].to_numpy(dtype=np.float64, na_value=np.nan)
+        COMPARISONS[comparison](values, threshold, out=flags[:, i])
+    return flags
+
+def pack_flags(flags):
+    """Pack each row of a flag matrix into one integer bit code (bit i = rule i)"""
+    dtype = np.min_scalar_type((1 << flags.shape[1]) - 1)
+    weights = (1 << np.arange(flags.shape[1])).astype(dtype)
+    return (flags.astype(dtype) * weights).sum(axis=1, dtype=dtype)
+
+def intervention_codes(df, rules=INTERVENTION_RULES):
+    """Compact flags: one bit code per employee instead of a rows x rules boolean matrix"""
+    return pack_flags(evaluate_interventions(df, rules))
+
+def code_histogram(codes, rules=INTERVENTION_RULES):
+    """Employees per bit code; histograms of separate chunks add up"""
+    return np.bincount(codes, minlength=1 << len(rules))
+
+def counts_from_histogram(histogram, rules=INTERVENTION_RULES):
+    """Employees flagged per action, plus how many have at least one action, from a code histogram"""
+    # Each action sums the histogram over the codes that have its bit set
+    bits = (np.arange(len(histogram))[:, None] >> np.arange(len(rules))) & 1
+    counts = pd.Series(histogram @ bits, index=intervention_actions(rules), dtype=np.int64)
+    counts['Any Intervention'] = int(histogram[1:].sum())
+    return counts
+
+def intervention_counts(codes, rules=INTERVENTION_RULES):
+    """Employees flagged per action, plus how many have at least one action, from bit codes"""
+    return counts_from_histogram(code_histogram(codes, rules), rules)
+
+def recommendations(flags_row, rules=INTERVENTION_RULES):
+    """Recommendation texts for one employee's flag row"""
+    return [text for flagged, (_, _, _, _, text) in zip(flags_row, rules) if flagged]
+
+def _flag_records(frame, flags, actions, id_column=None):
+    """Export records for one chunk: employee id, one 0/1 column per action and the action count"""
+    records = pd.DataFrame(flags.astype(np.uint8), columns=actions)
+    records.insert(0, 'EmployeeId', frame[id_column].to_numpy() if id_column else frame.index.to_numpy())
+    records['ActionCount'] = flags.sum(axis=1, dtype=np.uint8)
+    return records
+
+def iter_intervention_records(frames, rules=INTERVENTION_RULES, id_column=None, flagged_only=True):
+    """Turn a stream of employee frames into export-ready flag records, chunk by chunk
+
+    Each record holds the employee id (id_column, or the frame index), one
+    0/1 column per action and the action count. Only the current chunk is
+    ever held in memory.
+    """
+    actions = intervention_actions(rules)
+    for frame in frames:
+        records = _flag_records(frame, evaluate_interventions(frame, rules), actions, id_column)
+        yield records[records['ActionCount'] > 0] if flagged_only else records
+
+def chunk_frame(df, chunksize=100_000):
+    """Split an in-memory frame into row chunks for streaming"""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+def stream_interventions(frames, output, rules=INTERVENTION_RULES, id_column=None, flagged_only=True,
+                         output_format='csv'):
+    """Write flag records for a stream of employee frames; returns per-action counts
+
+    output is a path or a writable text buffer. output_format is 'csv' or
+    'jsonl' (one JSON object per employee).
+    """
+    if output_format not in ('csv', 'jsonl'):
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    actions = intervention_actions(rules)
+    histogram = np.zeros(1 << len(rules), dtype=np.int64)
+    handle = open(output, 'w', newline='') if isinstance(output, str) else output
+    try:
+        header = True
+        for frame in frames:
+            flags = evaluate_interventions(frame, rules)
+            # Counts accumulate as a histogram of packed codes, not per-action column sums
+            histogram += code_histogram(pack_flags(flags), rules)
+            records = _flag_records(frame, flags, actions, id_column)
+            if flagged_only:
+                records = records[records['ActionCount'] > 0]
+            if output_format == 'csv':
+                records.to_csv(handle, index=False, header=header)
+            elif len(records):
+                records.to_json(handle, orient='records', lines=True, force_ascii=False)
+            header = False
+    finally:
+        if isinstance(output, str):
+            handle.close()
+    return counts_from_histogram(histogram, rules)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export intervention flags for every employee in a results file")
+    parser.add_argument('results', help="CSV written by CareerProgressionAnalyzer.save_results")
+    parser.add_argument('--output', default='interventions.csv')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--id-column', default=None, help="Column holding the employee id (default: row number)")
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--all', action='store_true', help="Include employees with no flagged action")
+    args = parser.parse_args(argv)
+
+    # Row numbers stay global across chunks, so they can serve as ids
+    frames = pd.read_csv(args.results, chunksize=args.chunksize)
+    counts = stream_interventions(frames, args.output, id_column=args.id_column,
+                                  flagged_only=not args.all, output_format=args.format)
+    print(counts.to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
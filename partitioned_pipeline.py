@@ -0,0 +1,389 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from batch_runner import pin_worker_threads
+from career_progression_analysis import (BASE_CLUSTER_FEATURES, CLUSTER_DERIVED_FEATURES, ENCODED_CATEGORICAL_COLUMNS,
+                                         RetentionRanking, WorkforceSummary, categorize_risk_levels,
+                                         engineer_features, read_typed_csv, score_promotion_gap_risk,
+                                         summarize_clusters, workforce_insights)
+from pipeline_instrumentation import instrumented_stage
+from quantile_sketch import QuantileSketch, fill_and_bounds, merge_sketches, sketch_frame
+
+NUMERIC_FEATURES = BASE_CLUSTER_FEATURES + CLUSTER_DERIVED_FEATURES
+
+def split_csv(data_path, output_dir, rows_per_partition=1_000_000):
+    """Stream one large CSV into partition files without loading it whole"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i, chunk in enumerate(pd.read_csv(data_path, chunksize=rows_per_partition)):
+        path = os.path.join(output_dir, f'part-{i:05d}.csv')
+        chunk.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def merge_moments(moments):
+    """Combine per-partition (count, mean, sum of squared deviations) into count, mean and variance"""
+    count, mean, m2 = 0, 0.0, 0.0
+    for part_count, part_mean, part_m2 in moments:
+        total = count + part_count
+        delta = part_mean - mean
+        mean = mean + delta * (part_count / total)
+        m2 = m2 + part_m2 + delta ** 2 * (count * part_count / total)
+        count = total
+    return count, mean, m2 / count
+
+def fitted_scaler(count, mean, var, feature_names):
+    """StandardScaler carrying merged statistics, as if fit on the concatenated partitions"""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    scaler.mean_ = mean
+    scaler.var_ = var
+    # Constant (up to rounding) columns keep a unit scale, with StandardScaler's bound
+    eps = np.finfo(np.float64).eps
+    scale = np.sqrt(var)
+    scale[(var <= count * eps * var + (count * mean * eps) ** 2) | (scale < 10 * eps)] = 1.0
+    scaler.scale_ = scale
+    scaler.n_samples_seen_ = count
+    scaler.n_features_in_ = len(feature_names)
+    scaler.feature_names_in_ = np.asarray(feature_names, dtype=object)
+    return scaler
+
+def _read_partition(path, typed):
+    return read_typed_csv(path) if typed else pd.read_csv(path)
+
+def _scratch(scratch_dir, kind, part):
+    return os.path.join(scratch_dir, f'{kind}-{part:05d}.npy')
+
+def _profile_partition(part, path, scratch_dir, typed, dtype, capacity):
+    """Pass 1: engineer features, spill them to scratch and summarize their distribution"""
+    df = _read_partition(path, typed)
+    engineer_features(df, dtype=dtype)
+
+    numeric = pd.DataFrame({col: df[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in NUMERIC_FEATURES})
+    np.save(_scratch(scratch_dir, 'numeric', part), numeric.to_numpy())
+
+    # Categories are coded locally; the driver maps them onto the global sorted classes
+    encoded = [col for col in ENCODED_CATEGORICAL_COLUMNS if col in df.columns]
+    codes = np.empty((len(df), len(encoded)), dtype=np.int32)
+    categories = {}
+    counts = {}
+    for j, col in enumerate(encoded):
+        codes[:, j], uniques = pd.factorize(df[col].astype(str))
+        categories[col] = np.asarray(uniques, dtype=object)
+        counts[col] = np.bincount(codes[:, j], minlength=len(uniques))
+    np.save(_scratch(scratch_dir, 'codes', part), codes)
+
+    return {'rows': len(df), 'encoded': encoded, 'categories': categories, 'counts': counts,
+            'sketches': sketch_frame(numeric, capacity=capacity)}
+
+def _transform_partition(part, scratch_dir, mappings, fill, lower, upper, dtype):
+    """Pass 2: encode, fill and clip one partition; spill the feature matrix and return its moments"""
+    numeric = np.load(_scratch(scratch_dir, 'numeric', part))
+    codes = np.load(_scratch(scratch_dir, 'codes', part))
+    X = np.empty((len(numeric), numeric.shape[1] + codes.shape[1]), dtype=np.float64)
+    X[:, :numeric.shape[1]] = numeric
+    for j, mapping in enumerate(mappings):
+        X[:, numeric.shape[1] + j] = mapping[codes[:, j]]
+    X = np.clip(np.where(np.isnan(X), fill, X), lower, upper).astype(dtype, copy=False)
+
+    np.save(_scratch(scratch_dir, 'features', part), X)
+    os.remove(_scratch(scratch_dir, 'numeric', part))
+    os.remove(_scratch(scratch_dir, 'codes', part))
+
+    mean = X.mean(axis=0, dtype=np.float64)
+    return len(X), mean, ((X - mean) ** 2).sum(axis=0)
+
+def _sample_partition(part, scratch_dir, rows, scaler):
+    """Scaled feature rows of one partition, for seeding k-means"""
+    X = np.load(_scratch(scratch_dir, 'features', part), mmap_mode='r')
+    if len(rows) == 0:
+        return np.empty((0, X.shape[1]), dtype=X.dtype)
+    return scaler.transform(np.asarray(X[rows]))
+
+def _assign_batches(X, scaler, centers, batch_size):
+    """Nearest-centroid labels and squared distances, one scaled batch at a time"""
+    center_norms = (centers.astype(np.float64) ** 2).sum(axis=1)
+    for start in range(0, len(X), batch_size):
+        batch = scaler.transform(np.asarray(X[start:start + batch_size]))
+        distances = center_norms - 2 * (batch @ centers.T) + (batch.astype(np.float64) ** 2).sum(axis=1)[:, None]
+        labels = distances.argmin(axis=1)
+        yield batch, labels, np.maximum(distances[np.arange(len(labels)), labels], 0)
+
+def _centroid_partials(part, scratch_dir, scaler, centers, batch_size):
+    """One Lloyd step on one partition: per-centroid sums, counts and inertia"""
+    X = np.load(_scratch(scratch_dir, 'features', part), mmap_mode='r')
+    sums = np.zeros(centers.shape, dtype=np.float64)
+    counts = np.zeros(len(centers), dtype=np.int64)
+    inertia = 0.0
+    for batch, labels, distances in _assign_batches(X, scaler, centers, batch_size):
+        for cluster in range(len(centers)):
+            members = labels == cluster
+            sums[cluster] += batch[members].sum(axis=0, dtype=np.float64)
+        counts += np.bincount(labels, minlength=len(centers))
+        inertia += distances.sum()
+    return sums, counts, inertia
+
+def _finalize_partition(part, path, scratch_dir, offset, typed, dtype, scaler, centers, batch_size,
+                        output_dir, top_k):
+    """Final pass: label, score and rank one partition, writing its results"""
+    df = _read_partition(path, typed)
+    engineer_features(df, dtype=dtype)
+    # Global row positions keep employee ids unique across partitions
+    df.index = pd.RangeIndex(offset, offset + len(df))
+
+    X = np.load(_scratch(scratch_dir, 'features', part), mmap_mode='r')
+    df['CareerCluster'] = np.concatenate([labels for _, labels, _ in _assign_batches(X, scaler, centers, batch_size)])
+    df['PromotionGapRiskScore'] = score_promotion_gap_risk(df)
+    df['PromotionGapRiskLevel'] = categorize_risk_levels(df['PromotionGapRiskScore'])
+    ranking = RetentionRanking(df)
+
+    if output_dir is not None:
+        df.to_csv(os.path.join(output_dir, f'career_progression_results-{part:05d}.csv'), index=False)
+        ranking.frame().to_csv(os.path.join(output_dir, f'retention_opportunities-{part:05d}.csv'), index=False)
+
+    return {'summary': WorkforceSummary(df), 'opportunities': len(ranking), 'top': ranking.top(top_k)}
+
+class PartitionedAnalyzer:
+    def __init__(self, partition_paths, workers=None, blas_threads=None, scratch_dir=None, typed=False,
+                 compact=False, profiler=None):
+        """Career progression pipeline over CSV partitions processed by local worker processes
+
+        Each partition is engineered, encoded, filled and clipped on its own;
+        only small summaries come back to the driver: category sets, quantile
+        sketches for the fill values and clip bounds, moments for the scaler
+        and per-centroid sums for each k-means iteration. Feature matrices are
+        spilled to scratch .npy files and memory-mapped, so no process holds
+        more than one partition. While every column has at most
+        sketch_capacity distinct values the sketches are exact and the results
+        match the in-memory CareerProgressionAnalyzer; beyond that the fill
+        values and clip bounds carry quantile_rank_error. Spill files go in a
+        per-run directory inside scratch_dir (the system temp directory by
+        default) that close() removes.
+        """
+        self.partition_paths = list(partition_paths)
+        self.workers = workers or os.cpu_count() or 1
+        self.blas_threads = blas_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.typed = typed
+        self.compact = compact
+        self.feature_dtype = np.float32 if compact else np.float64
+        self.profiler = profiler
+        if scratch_dir is not None:
+            os.makedirs(scratch_dir, exist_ok=True)
+        self.scratch_dir = tempfile.mkdtemp(prefix='career_partitions_', dir=scratch_dir)
+        self._pool = None
+        self.partition_rows = None
+        self.scaler = None
+        self.cluster_centers = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker pool and remove this run's scratch directory"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+    def _map(self, function, *iterables):
+        """Run a worker function once per partition and collect the results in partition order"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=pin_worker_threads, initargs=(self.blas_threads,))
+        return list(self._pool.map(function, range(len(self.partition_paths)), *iterables))
+
+    def _per_partition(self, value):
+        return [value] * len(self.partition_paths)
+
+    @instrumented_stage('profile_partitions')
+    def profile_partitions(self, sketch_capacity=2048):
+        """Engineer every partition and merge category sets and quantile sketches"""
+        profiles = self._map(_profile_partition, self.partition_paths, self._per_partition(self.scratch_dir),
+                             self._per_partition(self.typed), self._per_partition(self.feature_dtype),
+                             self._per_partition(sketch_capacity))
+        self.partition_rows = np.array([profile['rows'] for profile in profiles])
+        self.offsets = np.concatenate([[0], np.cumsum(self.partition_rows)[:-1]])
+
+        encoded = profiles[0]['encoded']
+        if any(profile['encoded'] != encoded for profile in profiles):
+            raise ValueError("Partitions do not share the same categorical columns")
+
+        # Encoded classes are the sorted union of every partition's values, as LabelEncoder sorts them
+        from sklearn.preprocessing import LabelEncoder
+
+        self.le_dict = {}
+        self.category_mappings = []
+        sketches = merge_sketches(profile['sketches'] for profile in profiles)
+        for col in encoded:
+            classes = np.unique(np.concatenate([profile['categories'][col] for profile in profiles]).astype(str))
+            le = LabelEncoder()
+            le.classes_ = classes
+            self.le_dict[col] = le
+            self.category_mappings.append([np.searchsorted(classes, profile['categories'][col].astype(str))
+                                           for profile in profiles])
+
+            counts = np.zeros(len(classes))
+            for profile, mapping in zip(profiles, self.category_mappings[-1]):
+                np.add.at(counts, mapping, profile['counts'][col])
+            sketches[col + '_Encoded'] = QuantileSketch(sketch_capacity).update(np.arange(len(classes)),
+                                                                                weights=counts)
+
+        self.feature_names = NUMERIC_FEATURES + [col + '_Encoded' for col in encoded]
+        fill_values, self.clip_bounds = fill_and_bounds({col: sketches[col] for col in self.feature_names})
+        self.fill_values = pd.Series(fill_values)
+        self.quantile_rank_error = max(sketch.rank_error for sketch in sketches.values())
+
+        print(f"Profiled {len(self.partition_paths)} partitions with {self.partition_rows.sum()} employees "
+              f"(quantile rank error {self.quantile_rank_error:.4f})")
+        return self.partition_rows
+
+    @instrumented_stage('preprocess_data')
+    def preprocess_data(self):
+        """Encode, fill and clip every partition and merge their moments into the scaler"""
+        if self.partition_rows is None:
+            self.profile_partitions()
+
+        fill = self.fill_values[self.feature_names].to_numpy()
+        lower = np.array([self.clip_bounds[col][0] for col in self.feature_names])
+        upper = np.array([self.clip_bounds[col][1] for col in self.feature_names])
+        mappings = [[column[part] for column in self.category_mappings] for part in range(len(self.partition_paths))]
+        moments = self._map(_transform_partition, self._per_partition(self.scratch_dir), mappings,
+                            self._per_partition(fill), self._per_partition(lower), self._per_partition(upper),
+                            self._per_partition(self.feature_dtype))
+
+        count, mean, var = merge_moments(moments)
+        self.scaler = fitted_scaler(count, mean, var, self.feature_names)
+        print(f"Data preprocessing completed. Using {len(self.feature_names)} features for clustering.")
+        return self.scaler
+
+    @instrumented_stage('perform_clustering')
+    def perform_clustering(self, n_clusters=5, init_size=100_000, max_iter=300, tol=1e-4, batch_size=65_536):
+        """Distributed Lloyd k-means seeded by a full k-means fit on a row sample
+
+        The sample is drawn exactly as perform_clustering(method='minibatch')
+        draws it, so when it covers every row the seed is the in-memory fit.
+        Each iteration returns per-centroid sums and counts from every
+        partition and reduces them into the new global centroids.
+        """
+        from sklearn.cluster import KMeans
+
+        if self.scaler is None:
+            self.preprocess_data()
+
+        total = int(self.partition_rows.sum())
+        rng = np.random.default_rng(42)
+        if total <= init_size:
+            sample = np.arange(total)
+        else:
+            sample = np.sort(rng.choice(total, size=init_size, replace=False))
+        bounds = np.searchsorted(sample, np.concatenate([self.offsets, [total]]))
+        local_rows = [sample[bounds[part]:bounds[part + 1]] - self.offsets[part]
+                      for part in range(len(self.partition_paths))]
+        seed_rows = np.concatenate(self._map(_sample_partition, self._per_partition(self.scratch_dir), local_rows,
+                                             self._per_partition(self.scaler)))
+        centers = KMeans(n_clusters=n_clusters, random_state=42, n_init=10).fit(seed_rows).cluster_centers_
+
+        # Same stopping rule as KMeans: centroid shift against the mean feature variance
+        tolerance = tol * np.mean(self.scaler.var_ / self.scaler.scale_ ** 2)
+        for iteration in range(1, max_iter + 1):
+            partials = self._map(_centroid_partials, self._per_partition(self.scratch_dir),
+                                 self._per_partition(self.scaler), self._per_partition(centers),
+                                 self._per_partition(batch_size))
+            sums = sum(part_sums for part_sums, _, _ in partials)
+            counts = sum(part_counts for _, part_counts, _ in partials)
+            self.inertia = sum(inertia for _, _, inertia in partials)
+
+            # An empty cluster keeps its previous centroid
+            new_centers = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+            new_centers = new_centers.astype(centers.dtype)
+            shift = ((new_centers - centers) ** 2).sum()
+            centers = new_centers
+            if shift <= tolerance:
+                break
+
+        self.cluster_centers = centers
+        self.n_iter = iteration
+        print(f"Clustering completed in {iteration} distributed iterations (inertia {self.inertia:,.1f})")
+        return centers
+
+    @instrumented_stage('finalize_partitions')
+    def finalize(self, output_dir=None, top_k=20, batch_size=65_536):
+        """Assign clusters and risk levels per partition and merge the workforce summaries"""
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        results = self._map(_finalize_partition, self.partition_paths, self._per_partition(self.scratch_dir),
+                            self.offsets, self._per_partition(self.typed), self._per_partition(self.feature_dtype),
+                            self._per_partition(self.scaler), self._per_partition(self.cluster_centers),
+                            self._per_partition(batch_size), self._per_partition(output_dir),
+                            self._per_partition(top_k))
+
+        self.summary = WorkforceSummary.combine(result['summary'] for result in results)
+        self.n_opportunities = sum(result['opportunities'] for result in results)
+        # Partition tops are in global position order, so a stable sort keeps position tie-breaks
+        top = pd.concat([result['top'] for result in results])
+        self.top_opportunities = top.sort_values('RetentionOpportunityIndex', ascending=False,
+                                                 kind='stable').head(top_k)
+
+        self.cluster_analysis, self.cluster_labels = summarize_clusters(self.summary)
+        if output_dir is not None:
+            cluster_df = pd.DataFrame(self.cluster_analysis).T
+            cluster_df['ClusterLabel'] = cluster_df.index.map(self.cluster_labels)
+            cluster_df.to_csv(os.path.join(output_dir, 'cluster_analysis.csv'))
+
+        print(f"Identified {self.n_opportunities} employees for career intervention")
+        return self.summary
+
+    def generate_insights(self):
+        """Key stakeholder insights from the merged partition summaries"""
+        return workforce_insights(self.summary, self.cluster_labels, self.n_opportunities)
+
+def run_partitioned(analyzer, n_clusters=3, init_size=100_000, output_dir=None):
+    """Run every partitioned stage and print the insights"""
+    analyzer.profile_partitions()
+    analyzer.preprocess_data()
+    analyzer.perform_clustering(n_clusters, init_size=init_size)
+    analyzer.finalize(output_dir)
+    insights = analyzer.generate_insights()
+    for i, insight in enumerate(insights, 1):
+        print(f"{i}. {insight}")
+    return insights
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the career progression pipeline over partitioned CSVs")
+    parser.add_argument('data_paths', nargs='+', help="Partition CSVs, or one CSV to split with --partition-rows")
+    parser.add_argument('--partition-rows', type=int, default=None,
+                        help="Split a single input CSV into partitions of this many rows first")
+    parser.add_argument('--output-dir', default='partitioned_results')
+    parser.add_argument('--scratch-dir', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--blas-threads', type=int, default=None)
+    parser.add_argument('--clusters', type=int, default=3)
+    parser.add_argument('--init-size', type=int, default=100_000, help="Rows sampled to seed k-means")
+    parser.add_argument('--typed', action='store_true', help="Use schema-typed chunked ingestion")
+    parser.add_argument('--compact', action='store_true', help="Run in float32 / compact-dtype mode")
+    args = parser.parse_args(argv)
+
+    if args.partition_rows and len(args.data_paths) != 1:
+        parser.error("--partition-rows splits exactly one input CSV")
+
+    with tempfile.TemporaryDirectory(prefix='career_split_', dir=args.scratch_dir) as split_dir:
+        paths = args.data_paths
+        if args.partition_rows:
+            paths = split_csv(args.data_paths[0], split_dir, args.partition_rows)
+        with PartitionedAnalyzer(paths, workers=args.workers, blas_threads=args.blas_threads,
+                                 scratch_dir=args.scratch_dir, typed=args.typed, compact=args.compact) as analyzer:
+            run_partitioned(analyzer, args.clusters, args.init_size, args.output_dir)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import numpy as np
+
+class PeerIndex:
+    def __init__(self, X, groups=None, leafsize=16, eps=0.0):
+        """KD-tree index over scaled employee features for similar-employee queries
+
+        One tree is built per group (attrition by default), so "peers who
+        left" and "peers who stayed" are direct lookups and an ungrouped
+        query merges the per-group answers. eps > 0 makes queries
+        approximate: every returned neighbour is within (1 + eps) of the true
+        k-th distance, which prunes far more of the tree.
+        """
+        from scipy.spatial import cKDTree
+        
+        X = np.asarray(X)
+        groups = np.zeros(len(X), dtype=np.int64) if groups is None else np.asarray(groups)
+        self.n_rows = len(X)
+        self.eps = eps
+        self.trees = {}
+        self.positions = {}
+        for group in np.unique(groups):
+            positions = np.flatnonzero(groups == group)
+            # Sliding-midpoint splits query several times faster than median splits here
+            self.trees[group.item()] = cKDTree(X[positions], leafsize=leafsize, balanced_tree=False)
+            self.positions[group.item()] = positions
+        self.group_of = groups.copy()
+
+    @classmethod
+    def from_analyzer(cls, analyzer, **kwargs):
+        """Index an analyzer's X_scaled, grouped by attrition"""
+        attrition = analyzer.processed_df['Attrition'].to_numpy()
+        return cls(analyzer.X_scaled, groups=attrition, **kwargs)
+
+    def groups(self):
+        """Group values with a tree"""
+        return list(self.trees)
+
+    def query(self, x, k=5, group=None, eps=None):
+        """Distances and row positions of the k rows closest to feature vector x
+
+        x may also be a 2-D batch of vectors, answered with one tree query per
+        group and returned as one row of results per vector. group restricts
+        the search to one group; otherwise the nearest rows of every group are
+        merged.
+        """
+        eps = self.eps if eps is None else eps
+        single = np.ndim(x) < 2
+        X = np.asarray(x, dtype=np.float64).reshape(1, -1) if single else np.asarray(x, dtype=np.float64)
+        distances, positions = [], []
+        for key in ([group] if group is not None else self.trees):
+            tree = self.trees[key]
+            n = min(k, tree.n)
+            if n == 0:
+                continue
+            dist, idx = tree.query(X, k=n, eps=eps)
+            distances.append(np.reshape(dist, (len(X), n)))
+            positions.append(self.positions[key][np.reshape(idx, (len(X), n))])
+        if not distances:
+            distances = np.empty((len(X), 0))
+            positions = np.empty((len(X), 0), dtype=np.int64)
+        else:
+            distances = np.concatenate(distances, axis=1)
+            positions = np.concatenate(positions, axis=1)
+            order = np.lexsort((positions, distances), axis=-1)[:, :k]
+            distances = np.take_along_axis(distances, order, axis=1)
+            positions = np.take_along_axis(positions, order, axis=1)
+        return (distances[0], positions[0]) if single else (distances, positions)
+
+    def vector(self, position):
+        """Indexed feature vector of a row, read back from its tree"""
+        key = self.group_of[position].item()
+        local = np.searchsorted(self.positions[key], position)
+        return self.trees[key].data[local]
+
+    def peers_of(self, position, k=5, group=None, eps=None):
+        """The k rows closest to an indexed row, excluding the row itself"""
+        distances, positions = self.query(self.vector(position), k + 1, group, eps)
+        keep = positions != position
+        return distances[keep][:k], positions[keep][:k]
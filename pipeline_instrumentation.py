@@ -0,0 +1,242 @@
+import cProfile
+import functools
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+import pandas as pd
+
+class JsonLinesSink:
+    def __init__(self, path):
+        """Append each event as one JSON line to a file"""
+        self.path = path
+
+    def __call__(self, event):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(event, default=str) + '\n')
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where it cannot be read"""
+    try:
+        import resource
+    except ImportError:
+        # No resource module on Windows; psutil (optional) reports the peak working set there
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# DataFrame.copy is wrapped only while some profiler counts copies; the
+# wrapper credits profilers registered on the calling thread alone
+_copy_lock = threading.Lock()
+_copy_counters = {}
+_original_copy = None
+_copy_defined_on_class = False
+
+def _counting_copy(frame, *args, **kwargs):
+    for profiler in _copy_counters.get(threading.get_ident(), ()):
+        profiler._copy_count += 1
+    return _original_copy(frame, *args, **kwargs)
+
+@contextmanager
+def _count_frame_copies(profiler):
+    """Credit DataFrame.copy calls made on this thread to profiler while the block runs"""
+    global _original_copy, _copy_defined_on_class
+    thread = threading.get_ident()
+    with _copy_lock:
+        if not _copy_counters:
+            _original_copy = pd.DataFrame.copy
+            _copy_defined_on_class = 'copy' in vars(pd.DataFrame)
+            pd.DataFrame.copy = functools.wraps(_original_copy)(_counting_copy)
+        _copy_counters.setdefault(thread, []).append(profiler)
+    try:
+        yield
+    finally:
+        with _copy_lock:
+            _copy_counters[thread].remove(profiler)
+            if not _copy_counters[thread]:
+                del _copy_counters[thread]
+            # The last profiler out restores pandas, whatever order they exit in
+            if not _copy_counters:
+                if _copy_defined_on_class:
+                    pd.DataFrame.copy = _original_copy
+                else:
+                    del pd.DataFrame.copy
+                _original_copy = None
+
+class StageProfiler:
+    def __init__(self, sinks=None, trace_memory=False, profile=None, profile_top=15, count_copies=False):
+        """Record per-stage timings and resource use as structured events
+
+        sinks are callables that receive each event dict. profile may be
+        'cprofile' or 'pyinstrument' (sampling; optional dependency) to attach
+        a text profile of the stage to its event. trace_memory records each
+        outermost stage's traced peak but slows the pipeline down noticeably,
+        so it is off unless asked for. count_copies is a debugging aid that
+        wraps DataFrame.copy to count the copies each stage makes on its own
+        thread; frame_copies is None when it is off.
+        """
+        self.sinks = list(sinks or [])
+        self.trace_memory = trace_memory
+        self.count_copies = count_copies
+        self.profile = profile
+        self.profile_top = profile_top
+        self.run_id = uuid.uuid4().hex[:12]
+        self.events = []
+        self._depth = 0
+        self._copy_count = 0
+
+    def add_sink(self, sink):
+        """Register another event sink"""
+        self.sinks.append(sink)
+
+    def emit(self, event):
+        """Store an event and forward it to every sink"""
+        self.events.append(event)
+        for sink in self.sinks:
+            sink(event)
+
+    def _start_profiler(self):
+        if self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        if self.profile == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ImportError("profile='pyinstrument' requires the pyinstrument package")
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        if self.profile is not None:
+            raise ValueError(f"Unknown profiler: {self.profile}")
+        return None
+
+    def _stop_profiler(self, profiler):
+        if self.profile == 'cprofile':
+            profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(self.profile_top)
+            return output.getvalue()
+        profiler.stop()
+        return profiler.output_text()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Measure one pipeline stage; set record['rows_out'] inside the block"""
+        record = {'rows_in': rows_in, 'rows_out': None}
+        outermost = self._depth == 0
+        self._depth += 1
+
+        # Memory is only measured for the outermost stage so nested stages
+        # do not reset the peak their parent is tracking
+        started_tracing = False
+        if outermost and self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        rss_before = peak_rss_bytes()
+
+        copies_before = self._copy_count
+        profiler = self._start_profiler() if outermost else None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status, error = 'ok', None
+
+        try:
+            if outermost and self.count_copies:
+                with _count_frame_copies(self):
+                    yield record
+            else:
+                yield record
+        except Exception as exc:
+            status, error = 'error', repr(exc)
+            raise
+        finally:
+            event = {
+                'event': 'pipeline_stage',
+                'run_id': self.run_id,
+                'stage': name,
+                'status': status,
+                'error': error,
+                'depth': self._depth - 1,
+                'timestamp': time.time(),
+                'wall_time_s': time.perf_counter() - wall_start,
+                'cpu_time_s': time.process_time() - cpu_start,
+                'peak_memory_delta_bytes': None,
+                'peak_rss_growth_bytes': None,
+                'rows_in': record['rows_in'],
+                'rows_out': record['rows_out'],
+                'frame_copies': self._copy_count - copies_before if self.count_copies else None,
+            }
+            rss_after = peak_rss_bytes()
+            if rss_before is not None and rss_after is not None:
+                event['peak_rss_growth_bytes'] = rss_after - rss_before
+            if outermost and self.trace_memory:
+                event['peak_memory_delta_bytes'] = tracemalloc.get_traced_memory()[1] - memory_before
+                if started_tracing:
+                    tracemalloc.stop()
+            if profiler is not None:
+                event['profile'] = self._stop_profiler(profiler)
+            self._depth -= 1
+            self.emit(event)
+
+    def summary(self):
+        """Per-stage timing breakdown as a DataFrame"""
+        columns = ['stage', 'depth', 'status', 'wall_time_s', 'cpu_time_s', 'peak_memory_delta_bytes',
+                   'rows_in', 'rows_out', 'frame_copies']
+        return pd.DataFrame(self.events, columns=columns)
+
+    def format_breakdown(self):
+        """Human-readable per-stage timing table"""
+        summary = self.summary()
+        if summary.empty:
+            return "No stages recorded"
+        total = summary.loc[summary['depth'] == 0, 'wall_time_s'].sum()
+        lines = [f"{'Stage':<36}{'Wall (s)':>10}{'CPU (s)':>10}{'Peak MB':>10}{'Rows out':>10}{'Copies':>8}"]
+        for _, row in summary.iterrows():
+            peak = row['peak_memory_delta_bytes']
+            peak_mb = f"{peak / 1024 ** 2:.1f}" if pd.notna(peak) else '-'
+            rows_out = f"{int(row['rows_out'])}" if pd.notna(row['rows_out']) else '-'
+            stage = '  ' * int(row['depth']) + row['stage']
+            copies = f"{int(row['frame_copies'])}" if pd.notna(row['frame_copies']) else '-'
+            lines.append(f"{stage:<36}{row['wall_time_s']:>10.3f}{row['cpu_time_s']:>10.3f}"
+                         f"{peak_mb:>10}{rows_out:>10}{copies:>8}")
+        lines.append(f"{'Total':<36}{total:>10.3f}")
+        return '\n'.join(lines)
+
+def _frame_rows(analyzer):
+    """Rows in the analyzer's most recent frame, if any"""
+    for name in ('processed_df', 'df'):
+        frame = getattr(analyzer, name, None)
+        if frame is not None:
+            return len(frame)
+    return None
+
+def instrumented_stage(name):
+    """Decorate an analyzer method so it reports to analyzer.profiler when one is set"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None:
+                return method(self, *args, **kwargs)
+            with profiler.stage(name, rows_in=_frame_rows(self)) as record:
+                result = method(self, *args, **kwargs)
+                record['rows_out'] = _frame_rows(self)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,172 @@
+import numpy as np
+
+def _lerp(a, b, t):
+    """Linear interpolation computed the way numpy.quantile does"""
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+class QuantileSketch:
+    def __init__(self, capacity=2048):
+        """Mergeable weighted quantile summary of one numeric column
+
+        Distinct values are kept with their counts, so quantiles are exact
+        (matching pandas' linear interpolation) until the summary grows past
+        capacity points. Beyond that, neighbouring points are compacted into
+        weighted means. Each point keeps the range of values it stands for,
+        so rank_error is a bound computed from the current points rather
+        than accumulated per merge or compaction.
+        """
+        self.capacity = capacity
+        self.values = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.lows = np.empty(0, dtype=np.float64)
+        self.highs = np.empty(0, dtype=np.float64)
+        self.null_count = 0
+        self.min = np.nan
+        self.max = np.nan
+
+    @property
+    def count(self):
+        """Total weight of the non-null values seen"""
+        return float(self.weights.sum())
+
+    @property
+    def rank_error(self):
+        """Bound on the rank error of any quantile, as a fraction of count
+
+        A point can only misplace a rank for values inside its range, by at
+        most its weight, so the bound is the largest total weight of points
+        whose ranges cover any single value.
+        """
+        spread = self.lows < self.highs
+        if not spread.any():
+            return 0.0
+        weights = self.weights[spread]
+        # A range covers lows <= x < highs; at a shared coordinate ends come before starts
+        coords = np.concatenate([self.lows[spread], self.highs[spread]])
+        deltas = np.concatenate([weights, -weights])
+        covered = np.cumsum(deltas[np.lexsort((deltas, coords))])
+        return float(covered.max() / self.count)
+
+    @property
+    def exact(self):
+        """True while every point stands for a single value"""
+        return self.rank_error == 0.0
+
+    def update(self, values, weights=None):
+        """Add a batch of values; nulls are counted but not summarized"""
+        values = np.asarray(values, dtype=np.float64)
+        if weights is None:
+            weights = np.ones(len(values))
+        else:
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), values.shape)
+        present = ~np.isnan(values)
+        self.null_count += int(np.count_nonzero(~present))
+        self._absorb(values[present], weights[present], values[present], values[present])
+        return self
+
+    def merge(self, other):
+        """Fold another sketch of the same column into this one"""
+        if other.capacity != self.capacity:
+            raise ValueError("Can only merge sketches with the same capacity")
+        self.null_count += other.null_count
+        self._absorb(other.values, other.weights, other.lows, other.highs)
+        return self
+
+    def _absorb(self, values, weights, lows, highs):
+        if len(values) == 0:
+            return
+        self.min = np.nanmin([self.min, values.min()])
+        self.max = np.nanmax([self.max, values.max()])
+
+        # Collapse duplicates so discrete columns stay exact at any size
+        uniques, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+        self.weights = np.bincount(inverse, weights=np.concatenate([self.weights, weights]))
+        self.values = uniques
+        self.lows, self.highs = self._ranges(inverse, len(uniques), np.concatenate([self.lows, lows]),
+                                             np.concatenate([self.highs, highs]))
+        if len(self.values) > self.capacity:
+            self._compact()
+
+    def _compact(self):
+        """Merge neighbouring points into about capacity equal-weight bins"""
+        cumulative = np.cumsum(self.weights)
+        target = cumulative[-1] / self.capacity
+        bins = np.minimum(((cumulative - self.weights) / target).astype(np.int64), self.capacity - 1)
+        weights = np.bincount(bins, weights=self.weights)
+        sums = np.bincount(bins, weights=self.values * self.weights)
+        occupied = weights > 0
+        lows, highs = self._ranges(bins, len(weights), self.lows, self.highs)
+        self.values = sums[occupied] / weights[occupied]
+        self.weights = weights[occupied]
+        self.lows = lows[occupied]
+        self.highs = highs[occupied]
+
+    @staticmethod
+    def _ranges(groups, size, lows, highs):
+        """Smallest low and largest high of the points falling in each group"""
+        group_lows = np.full(size, np.inf)
+        group_highs = np.full(size, -np.inf)
+        np.minimum.at(group_lows, groups, lows)
+        np.maximum.at(group_highs, groups, highs)
+        return group_lows, group_highs
+
+    def _order_statistics(self, positions):
+        """Values at 0-based ranks of the expanded sorted column"""
+        cumulative = np.cumsum(self.weights)
+        index = np.searchsorted(cumulative, positions, side='right')
+        return self.values[np.minimum(index, len(self.values) - 1)]
+
+    def quantile(self, q):
+        """Quantile(s) with linear interpolation between neighbouring ranks"""
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        q = np.asarray(q, dtype=np.float64)
+        position = (self.count - 1) * q
+        lower = np.floor(position)
+        result = _lerp(self._order_statistics(lower), self._order_statistics(np.ceil(position)),
+                       position - lower)
+        result = np.clip(result, self.min, self.max)
+        return float(result) if result.ndim == 0 else result
+
+    def median(self):
+        """Median as the mean of the two middle ranks, like pandas"""
+        if self.count == 0:
+            return np.nan
+        middle = (self.count - 1) / 2
+        low, high = self._order_statistics(np.array([np.floor(middle), np.ceil(middle)]))
+        return float(np.mean([low, high]))
+
+def sketch_frame(df, columns=None, capacity=2048):
+    """Build one sketch per column of a frame (or of one chunk of it)"""
+    columns = list(df.columns) if columns is None else columns
+    return {col: QuantileSketch(capacity).update(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            for col in columns}
+
+def merge_sketches(partials):
+    """Merge per-chunk or per-worker sketch dicts column by column"""
+    merged = {}
+    for sketches in partials:
+        for col, sketch in sketches.items():
+            if col not in merged:
+                merged[col] = QuantileSketch(sketch.capacity)
+            merged[col].merge(sketch)
+    return merged
+
+def fill_and_bounds(sketches, lower=0.01, upper=0.99):
+    """Median fill values and clip bounds from merged column sketches
+
+    The bounds describe the column after its nulls are filled with the
+    median, as the exact preprocessing computes them.
+    """
+    fill_values = {}
+    clip_bounds = {}
+    for col, sketch in sketches.items():
+        fill = sketch.median()
+        fill_values[col] = fill
+        filled = QuantileSketch(sketch.capacity).merge(sketch)
+        if sketch.null_count and not np.isnan(fill):
+            filled.update(np.array([fill]), weights=sketch.null_count)
+        low, high = filled.quantile([lower, upper])
+        clip_bounds[col] = (float(low), float(high))
+    return fill_values, clip_bounds
@@ -0,0 +1,406 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import uuid
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from analysis_cache import read_columnar_frame, write_columnar_frame
+from career_progression_analysis import COMPARISONS, downcast_integer_columns, engineer_features
+
+# Bump when the on-disk layout changes; stores of another version are refused
+STORE_FORMAT_VERSION = 1
+
+# Rows per row group; statistics are kept per group so queries can skip groups
+ROW_GROUP_SIZE = 65_536
+
+# Identity column stored when snapshots have no employee id (row position is the identity)
+POSITION_COLUMN = 'RowPosition'
+
+FILTER_OPERATORS = dict(COMPARISONS, **{'==': np.equal, '!=': np.not_equal})
+
+# Aggregates that can be answered from row-group statistics alone
+STATISTIC_AGGREGATES = ['mean', 'sum', 'count', 'min', 'max']
+
+def row_group_stats(frame, id_name, row_group_size=ROW_GROUP_SIZE):
+    """Per-row-group id range plus min/max/sum/count of numeric columns and codes present in categoricals"""
+    n = len(frame)
+    starts = np.arange(0, n, row_group_size)
+    stops = np.minimum(starts + row_group_size, n)
+    ids = frame[id_name].to_numpy()
+    groups = [{'start': int(start), 'stop': int(stop), 'id_min': ids[start].item(),
+               'id_max': ids[stop - 1].item(), 'columns': {}} for start, stop in zip(starts, stops)]
+
+    for name, series in frame.items():
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            for group in groups:
+                present = np.unique(codes[group['start']:group['stop']])
+                group['columns'][name] = {'codes': present[present >= 0].tolist(),
+                                          'nulls': int(np.count_nonzero(codes[group['start']:group['stop']] < 0))}
+        else:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            present = ~np.isnan(values)
+            # fmin/fmax skip nulls; an all-null group gets NaN bounds and a zero count
+            mins = np.fmin.reduceat(values, starts)
+            maxs = np.fmax.reduceat(values, starts)
+            sums = np.add.reduceat(np.where(present, values, 0), starts)
+            counts = np.add.reduceat(present.astype(np.int64), starts)
+            for i, group in enumerate(groups):
+                group['columns'][name] = {'min': float(mins[i]), 'max': float(maxs[i]),
+                                          'sum': float(sums[i]), 'count': int(counts[i])}
+    return groups
+
+def _group_may_match(stats, op, value, code=None):
+    """False when a row group's statistics prove no row passes the filter"""
+    if 'codes' in stats:
+        present = stats['codes']
+        if op == '==':
+            return code in present
+        if op == 'in':
+            return any(c in present for c in code)
+        if op == '!=':
+            return stats['nulls'] > 0 or present != [code]
+        return True
+    if stats['count'] == 0:
+        return op == '!='
+    low, high = stats['min'], stats['max']
+    if op == '==':
+        return low <= value <= high
+    if op == 'in':
+        return any(low <= v <= high for v in value)
+    if op == '!=':
+        return not (low == high == value)
+    if op in ('>', '>='):
+        return high > value or (op == '>=' and high == value)
+    if op in ('<', '<='):
+        return low < value or (op == '<=' and low == value)
+    raise ValueError(f"Unknown filter operator: {op}")
+
+class SnapshotStore:
+    def __init__(self, store_dir, id_column=None, row_group_size=ROW_GROUP_SIZE):
+        """Append-only columnar store of successive workforce extracts
+
+        Every snapshot is written once with write_columnar_frame, sorted by
+        employee id. String columns are encoded against store-wide
+        dictionaries that only ever grow, so codes mean the same thing in
+        every snapshot. Integers are downcast and derived features kept as
+        float32. Each snapshot carries row-group statistics. The sorted id
+        column is the employee index: a trajectory lookup is one binary
+        search per snapshot over a memory-mapped column.
+        """
+        self.store_dir = store_dir
+        self.manifest_path = os.path.join(store_dir, 'store.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('format_version') != STORE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported store format {self.manifest.get('format_version')}")
+            if id_column is not None and id_column != self.manifest['id_column']:
+                raise ValueError(f"Store is keyed on {self.manifest['id_column']}, not {id_column}")
+        else:
+            os.makedirs(store_dir, exist_ok=True)
+            self.manifest = {'format_version': STORE_FORMAT_VERSION, 'id_column': id_column,
+                             'row_group_size': row_group_size, 'dictionaries': {}, 'snapshots': []}
+        self._stats = {}
+        self._layouts = {}
+        self._code_lookups = {}
+
+    @property
+    def id_name(self):
+        """Stored name of the employee id column"""
+        return self.manifest['id_column'] or POSITION_COLUMN
+
+    def snapshots(self):
+        """Snapshot labels in append order"""
+        return [entry['label'] for entry in self.manifest['snapshots']]
+
+    def _write_manifest(self):
+        # Write then rename so readers never see a half-written manifest
+        staging = f'{self.manifest_path}.{uuid.uuid4().hex}'
+        with open(staging, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(staging, self.manifest_path)
+
+    def _encode(self, frame):
+        """Dictionary-encode string columns against the store dictionaries, extending them"""
+        for name, series in frame.items():
+            if name == self.id_name or is_numeric_dtype(series.dtype):
+                continue
+            dictionary = self.manifest['dictionaries'].setdefault(name, [])
+            known = set(dictionary)
+            added = [value for value in pd.unique(series.dropna().astype(str)) if value not in known]
+            if added:
+                dictionary.extend(added)
+                # Lookups built before this append would miss the new values
+                self._code_lookups.pop(name, None)
+            frame[name] = pd.Categorical(series.astype(str).where(series.notna()), categories=dictionary)
+        return frame
+
+    def append(self, df, label, derived=True):
+        """Add one extract as a new snapshot; existing snapshots are never rewritten"""
+        if label in self.snapshots():
+            raise ValueError(f"Snapshot {label!r} already exists")
+        frame = df.copy()
+        if self.manifest['id_column'] is None:
+            frame[POSITION_COLUMN] = np.arange(len(frame))
+        elif self.id_name not in frame.columns:
+            raise ValueError(f"Snapshot has no {self.id_name} column")
+        if not is_numeric_dtype(frame[self.id_name]) or frame[self.id_name].isna().any():
+            raise ValueError(f"{self.id_name} must be a numeric id without nulls")
+        if not frame[self.id_name].is_unique:
+            raise ValueError(f"Duplicate {self.id_name} values in snapshot")
+
+        if derived:
+            engineer_features(frame, dtype=np.float32)
+        frame = frame.sort_values(self.id_name, kind='stable').reset_index(drop=True)
+        downcast_integer_columns(frame)
+        self._encode(frame)
+
+        # Stage the snapshot and rename it into place before it is listed in the manifest
+        directory = f"snapshot-{len(self.manifest['snapshots']):05d}"
+        target = os.path.join(self.store_dir, directory)
+        staging = os.path.join(self.store_dir, f'.tmp-{uuid.uuid4().hex}')
+        try:
+            write_columnar_frame(frame, staging)
+            stats = row_group_stats(frame, self.id_name, self.manifest['row_group_size'])
+            with open(os.path.join(staging, 'stats.json'), 'w') as f:
+                json.dump({'row_groups': stats}, f)
+            if os.path.exists(target):
+                # Left over from an append that died before updating the manifest
+                shutil.rmtree(target)
+            os.replace(staging, target)
+        finally:
+            if os.path.exists(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+
+        ids = frame[self.id_name]
+        self.manifest['snapshots'].append({'label': label, 'directory': directory, 'rows': len(frame),
+                                           'id_min': ids.iloc[0].item() if len(frame) else None,
+                                           'id_max': ids.iloc[-1].item() if len(frame) else None})
+        self._write_manifest()
+        return label
+
+    def _entry(self, label):
+        for entry in self.manifest['snapshots']:
+            if entry['label'] == label:
+                return entry
+        raise KeyError(f"No snapshot {label!r}")
+
+    def _row_groups(self, entry):
+        """Row-group statistics of a snapshot, loaded once"""
+        if entry['directory'] not in self._stats:
+            with open(os.path.join(self.store_dir, entry['directory'], 'stats.json')) as f:
+                self._stats[entry['directory']] = json.load(f)['row_groups']
+        return self._stats[entry['directory']]
+
+    def _layout(self, entry):
+        """Column entries of a snapshot's frame.json by name, loaded once"""
+        if entry['directory'] not in self._layouts:
+            with open(os.path.join(self.store_dir, entry['directory'], 'frame.json')) as f:
+                self._layouts[entry['directory']] = {column['name']: column for column in json.load(f)['columns']}
+        return self._layouts[entry['directory']]
+
+    def _array(self, entry, name):
+        """Memory-mapped stored values (codes for dictionary-encoded columns) of one column"""
+        column = self._layout(entry)[name]
+        return np.load(os.path.join(self.store_dir, entry['directory'], column['file']), mmap_mode='r')
+
+    def _code(self, name, value):
+        """Dictionary code of a value, or -2 when the store has never seen it"""
+        if name not in self._code_lookups:
+            self._code_lookups[name] = {v: i for i, v in enumerate(self.manifest['dictionaries'][name])}
+        return self._code_lookups[name].get(str(value), -2)
+
+    def read(self, label, columns=None):
+        """One snapshot as a frame, memory-mapped and limited to columns"""
+        entry = self._entry(label)
+        return read_columnar_frame(os.path.join(self.store_dir, entry['directory']), columns=columns)
+
+    def trajectory(self, employee_id, columns=None):
+        """One employee's values in every snapshot they appear in, one row per snapshot"""
+        rows = []
+        labels = []
+        for entry in self.manifest['snapshots']:
+            if entry['rows'] == 0 or not entry['id_min'] <= employee_id <= entry['id_max']:
+                continue
+            ids = self._array(entry, self.id_name)
+            position = int(np.searchsorted(ids, employee_id))
+            if position == len(ids) or ids[position] != employee_id:
+                continue
+
+            layout = self._layout(entry)
+            row = {}
+            for name in (columns or list(layout)):
+                if name not in layout:
+                    row[name] = np.nan
+                    continue
+                value = self._array(entry, name)[position]
+                if layout[name]['kind'] in ('category', 'object'):
+                    value = layout[name]['categories'][value] if value >= 0 else np.nan
+                else:
+                    value = value.item()
+                row[name] = value
+            rows.append(row)
+            labels.append(entry['label'])
+        return pd.DataFrame(rows, index=pd.Index(labels, name='snapshot'), columns=columns)
+
+    def _filter_mask(self, entry, where, rows):
+        """Rows (a slice or positions) of a snapshot that pass every filter"""
+        layout = self._layout(entry)
+        mask = None
+        for name, op, value in where:
+            values = self._array(entry, name)[rows]
+            if layout[name]['kind'] in ('category', 'object'):
+                if op == 'in':
+                    passed = np.isin(values, [self._code(name, v) for v in value])
+                elif op in ('==', '!='):
+                    passed = FILTER_OPERATORS[op](values, self._code(name, value))
+                else:
+                    raise ValueError(f"Operator {op} does not apply to categorical column {name}")
+            elif op == 'in':
+                passed = np.isin(values, list(value))
+            else:
+                passed = FILTER_OPERATORS[op](values, value)
+            mask = passed if mask is None else mask & passed
+        return mask
+
+    def _group_survives(self, group, where):
+        for name, op, value in where:
+            stats = group['columns'].get(name)
+            if stats is None:
+                return False
+            if 'codes' in stats:
+                code = [self._code(name, v) for v in value] if op == 'in' else self._code(name, value)
+            else:
+                code = None
+            if not _group_may_match(stats, op, value, code):
+                return False
+        return True
+
+    def cohort_metric(self, metric, agg='mean', where=None, employee_ids=None, snapshots=None):
+        """One aggregate of a numeric metric per snapshot over the employees matching a cohort
+
+        where is a list of (column, operator, value) filters with operators
+        ==, !=, >, >=, <, <= and in. employee_ids fixes the cohort by
+        identity instead, found by binary search in each snapshot. Row
+        groups whose statistics rule out a filter or hold none of the ids
+        are never read. Without either, mean/sum/count/min/max come straight
+        from the statistics.
+        """
+        where = list(where or [])
+        labels = self.snapshots() if snapshots is None else list(snapshots)
+        cohort = None if employee_ids is None else np.unique(np.asarray(employee_ids))
+        results = []
+        self.last_query = {'row_groups_read': 0, 'row_groups_total': 0}
+
+        for label in labels:
+            entry = self._entry(label)
+            groups = self._row_groups(entry)
+            self.last_query['row_groups_total'] += len(groups)
+            if metric not in self._layout(entry) or self._layout(entry)[metric]['kind'] != 'numeric':
+                raise ValueError(f"{metric} is not a numeric column of snapshot {label!r}")
+
+            if not where and cohort is None and agg in STATISTIC_AGGREGATES:
+                stats = [group['columns'][metric] for group in groups]
+                count = sum(s['count'] for s in stats)
+                value = {
+                    'mean': sum(s['sum'] for s in stats) / count if count else np.nan,
+                    'sum': sum(s['sum'] for s in stats),
+                    'count': count,
+                    'min': np.nanmin([s['min'] for s in stats]) if count else np.nan,
+                    'max': np.nanmax([s['max'] for s in stats]) if count else np.nan,
+                }[agg]
+                results.append({'snapshot': label, 'employees': entry['rows'], 'value': float(value)})
+                continue
+
+            if cohort is not None:
+                ids = self._array(entry, self.id_name)
+                found = np.searchsorted(ids, cohort)
+                hit = found < len(ids)
+                hit[hit] = ids[found[hit]] == cohort[hit]
+                positions = found[hit]
+
+            parts = []
+            employees = 0
+            for group in groups:
+                if not self._group_survives(group, where):
+                    continue
+                if cohort is None:
+                    rows = slice(group['start'], group['stop'])
+                else:
+                    rows = positions[(positions >= group['start']) & (positions < group['stop'])]
+                    if len(rows) == 0:
+                        continue
+                self.last_query['row_groups_read'] += 1
+                values = np.asarray(self._array(entry, metric)[rows], dtype=np.float64)
+                if where:
+                    values = values[self._filter_mask(entry, where, rows)]
+                employees += len(values)
+                parts.append(values)
+
+            values = np.concatenate(parts) if parts else np.empty(0)
+            values = values[~np.isnan(values)]
+            if agg == 'count':
+                value = len(values)
+            elif len(values) == 0:
+                value = np.nan
+            else:
+                value = {'mean': np.mean, 'sum': np.sum, 'min': np.min, 'max': np.max,
+                         'median': np.median}[agg](values)
+            results.append({'snapshot': label, 'employees': employees, 'value': float(value)})
+
+        return pd.DataFrame(results, columns=['snapshot', 'employees', 'value']).set_index('snapshot')
+
+def _parse_filter(text):
+    """Parse 'Column op value' (value may be a number); 'in' takes comma-separated values"""
+    name, op, value = text.split(None, 2)
+    def convert(item):
+        try:
+            return float(item)
+        except ValueError:
+            return item
+    if op == 'in':
+        return name, op, [convert(item.strip()) for item in value.split(',')]
+    return name, op, convert(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append-only snapshot store with trajectory and cohort queries")
+    parser.add_argument('--store', default='snapshot_store')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    append = commands.add_parser('append', help="Append one extract as a snapshot")
+    append.add_argument('data_path')
+    append.add_argument('--label', required=True, help="Snapshot label, e.g. 2024-06")
+    append.add_argument('--id', default=None, help="Employee id column (fixed when the store is created)")
+
+    trajectory = commands.add_parser('trajectory', help="One employee across every snapshot")
+    trajectory.add_argument('employee_id', type=float)
+    trajectory.add_argument('--columns', nargs='+', default=None)
+
+    cohort = commands.add_parser('cohort', help="A cohort metric per snapshot")
+    cohort.add_argument('metric')
+    cohort.add_argument('--agg', choices=STATISTIC_AGGREGATES + ['median'], default='mean')
+    cohort.add_argument('--where', action='append', default=[], help="Filter such as 'Department == Sales'")
+    cohort.add_argument('--last', type=int, default=None, help="Only the most recent N snapshots")
+    args = parser.parse_args(argv)
+
+    if args.command == 'append':
+        store = SnapshotStore(args.store, id_column=args.id)
+        store.append(pd.read_csv(args.data_path), args.label)
+        print(f"Appended snapshot {args.label}; store holds {len(store.snapshots())} snapshots")
+    elif args.command == 'trajectory':
+        store = SnapshotStore(args.store)
+        print(store.trajectory(args.employee_id, args.columns).to_string())
+    else:
+        store = SnapshotStore(args.store)
+        labels = store.snapshots()[-args.last:] if args.last else None
+        table = store.cohort_metric(args.metric, args.agg, [_parse_filter(text) for text in args.where],
+                                    snapshots=labels)
+        print(table.to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,28 @@
+import io
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import seaborn as sns
-import matplotlib.pyplot as plt
-from career_progression_analysis import CareerProgressionAnalyzer
+from career_progression_analysis import (
+    DEFAULT_RISK_LEVEL,
+    RISK_LEVEL_CUTOFFS,
+    RISK_SCORING_CRITERIA,
+    CareerProgressionAnalyzer,
+)
+from analysis_cache import AnalysisCache
+from dashboard_data import CAREER_STAGES, SharedAnalysisStore
+from interventions import (
+    chunk_frame,
+    evaluate_interventions,
+    recommendations,
+    stream_interventions,
+)
+from pipeline_instrumentation import StageProfiler
+
+# Derived frames never write back into the shared analysis results
+pd.set_option('mode.copy_on_write', True)
 
 # Set page configuration
 st.set_page_config(
@@ -40,32 +56,55 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Pipeline settings used by the dashboard; part of the analysis cache key
+DATA_PATH = 'Palo Alto Networks.csv'
+PIPELINE_CONFIG = {'n_clusters': 3}
+
 # Load data and analysis
-@st.cache_data
 def load_analysis():
+    # Reuse fitted results from a previous run when the input and config are unchanged
+    cache = AnalysisCache()
     try:
-        analyzer = CareerProgressionAnalyzer('Palo Alto Networks.csv')
-        analyzer.load_data()
+        cache_key = cache.key_for(DATA_PATH, PIPELINE_CONFIG)
     except FileNotFoundError:
         st.error("❌ Data file 'Palo Alto Networks.csv' not found!")
         st.info("Please ensure the CSV file is in the same directory as the app.")
         st.stop()
     
+    # Stage timings for this load are shown in the dashboard footer
+    profiler = StageProfiler()
+    with profiler.stage('load_from_cache') as record:
+        analyzer = cache.load(cache_key)
+        record['rows_out'] = len(analyzer.processed_df) if analyzer is not None else 0
+    if analyzer is not None:
+        analyzer.profiler = profiler
+        return analyzer
+    
+    analyzer = CareerProgressionAnalyzer(DATA_PATH, profiler=profiler)
+    analyzer.load_data()
     analyzer.feature_engineering()
     analyzer.preprocess_data()
     
     # Use optimal clusters from analysis
-    analyzer.perform_clustering(3)
+    analyzer.perform_clustering(PIPELINE_CONFIG['n_clusters'])
     analyzer.interpret_clusters()
+    analyzer.build_peer_index()
     analyzer.calculate_promotion_gap_risk_score()
     analyzer.identify_retention_opportunities()
     
+    cache.store(cache_key, analyzer)
     return analyzer
 
+@st.cache_resource
+def load_store():
+    # One process-wide, read-only copy of the results shared by every session and rerun
+    return SharedAnalysisStore(load_analysis())
+
 def main():
     # Load analysis
-    analyzer = load_analysis()
-    df = analyzer.processed_df
+    store = load_store()
+    analyzer = store.analyzer
+    filter_index = store.filter_index
     
     # Main header
     st.markdown('<h1 class="main-header">📊 Career Progression & Promotion Gap Analysis</h1>', unsafe_allow_html=True)
@@ -75,40 +114,32 @@ def main():
     st.sidebar.markdown("### 🔍 Filters & Controls")
     
     # Department filter
-    departments = ['All'] + list(df['Department'].unique())
+    departments = ['All'] + filter_index.options('dept')
     selected_dept = st.sidebar.selectbox('Department', departments)
     
     # Job Role filter
-    roles = ['All'] + list(df['JobRole'].unique())
+    roles = ['All'] + filter_index.options('role')
     selected_role = st.sidebar.selectbox('Job Role', roles)
     
     # Career Stage filter
-    career_stages = ['All', 'Early Career (0-3 years)', 'Mid Career (4-7 years)', 'Senior Career (8+ years)']
+    career_stages = ['All'] + list(CAREER_STAGES)
     selected_career_stage = st.sidebar.selectbox('Career Stage', career_stages)
     
     # Promotion Gap Risk Level filter
-    risk_levels = ['All'] + list(df['PromotionGapRiskLevel'].unique())
+    risk_levels = ['All'] + filter_index.options('risk')
     selected_risk = st.sidebar.selectbox('Promotion Gap Risk Level', risk_levels)
     
-    # Apply filters
-    filtered_df = df.copy()
-    
-    if selected_dept != 'All':
-        filtered_df = filtered_df[filtered_df['Department'] == selected_dept]
+    # Apply filters by intersecting the precomputed row indexes
+    filtered_df = filter_index.filter(selected_dept, selected_role, selected_career_stage, selected_risk)
     
-    if selected_role != 'All':
-        filtered_df = filtered_df[filtered_df['JobRole'] == selected_role]
+    # Tab aggregates come from the cube, memoized on the filter selection
+    aggregate_cache = store.aggregates
+    aggregates = aggregate_cache.get(selected_dept, selected_role, selected_career_stage, selected_risk)
+    cache_stats = aggregate_cache.stats()
+    st.sidebar.caption(f"Aggregate cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
     
-    if selected_career_stage != 'All':
-        if selected_career_stage == 'Early Career (0-3 years)':
-            filtered_df = filtered_df[filtered_df['YearsAtCompany'] <= 3]
-        elif selected_career_stage == 'Mid Career (4-7 years)':
-            filtered_df = filtered_df[(filtered_df['YearsAtCompany'] >= 4) & (filtered_df['YearsAtCompany'] <= 7)]
-        else:  # Senior Career
-            filtered_df = filtered_df[filtered_df['YearsAtCompany'] >= 8]
-    
-    if selected_risk != 'All':
-        filtered_df = filtered_df[filtered_df['PromotionGapRiskLevel'] == selected_risk]
+    # KPI and footer figures come from the selection's memoized summary cube
+    summary = aggregates['summary']
     
     # Key Metrics Dashboard
     st.markdown("### 📈 Key Performance Indicators")
@@ -120,16 +151,16 @@ def main():
         st.metric("Total Employees", f"{total_employees:,}")
     
     with col2:
-        high_risk_count = len(filtered_df[filtered_df['PromotionGapRiskLevel'] == 'High'])
+        high_risk_count = summary.count('PromotionGapRiskLevel', 'High')
         high_risk_pct = (high_risk_count / total_employees * 100) if total_employees > 0 else 0
         st.metric("High Risk Employees", f"{high_risk_count} ({high_risk_pct:.1f}%)")
     
     with col3:
-        avg_promotion_gap = filtered_df['PromotionGapRatio'].mean()
+        avg_promotion_gap = summary.mean('PromotionGapRatio')
         st.metric("Avg Promotion Gap", f"{avg_promotion_gap:.3f}")
     
     with col4:
-        attrition_rate = filtered_df['Attrition'].mean() * 100
+        attrition_rate = summary.mean('Attrition') * 100
         st.metric("Attrition Rate", f"{attrition_rate:.1f}%")
     
     # Tab-based navigation
@@ -138,11 +169,14 @@ def main():
     with tab1:
         st.markdown("### Career Path Clustering Dashboard")
         
+        # Per-cluster sizes and means, re-aggregated from the summary cube
+        cluster_stats = summary.by('CareerCluster')
+        
         col1, col2 = st.columns(2)
         
         with col1:
             # Cluster distribution pie chart
-            cluster_counts = filtered_df['CareerCluster'].value_counts()
+            cluster_counts = cluster_stats['size'].sort_values(ascending=False, kind='stable')
             cluster_labels = [analyzer.cluster_labels[i] for i in cluster_counts.index]
             
             fig_pie = px.pie(
@@ -158,35 +192,30 @@ def main():
             st.markdown("#### Career Pattern Summaries")
             
             for cluster_id in analyzer.cluster_analysis.keys():
-                if cluster_id in filtered_df['CareerCluster'].values:
-                    cluster_data = filtered_df[filtered_df['CareerCluster'] == cluster_id]
+                if cluster_id in cluster_stats.index:
+                    cluster_data = cluster_stats.loc[cluster_id]
                     label = analyzer.cluster_labels[cluster_id]
-                    size = len(cluster_data)
+                    size = int(cluster_data['size'])
                     
                     with st.expander(f"{label} ({size} employees)"):
                         col_a, col_b = st.columns(2)
                         
                         with col_a:
-                            st.metric("Avg Years at Company", f"{cluster_data['YearsAtCompany'].mean():.1f}")
-                            st.metric("Avg Promotion Gap", f"{cluster_data['PromotionGapRatio'].mean():.3f}")
-                            st.metric("Career Velocity", f"{cluster_data['CareerVelocityScore'].mean():.2f}")
+                            st.metric("Avg Years at Company", f"{cluster_data['YearsAtCompany']:.1f}")
+                            st.metric("Avg Promotion Gap", f"{cluster_data['PromotionGapRatio']:.3f}")
+                            st.metric("Career Velocity", f"{cluster_data['CareerVelocityScore']:.2f}")
                         
                         with col_b:
-                            st.metric("Avg Job Level", f"{cluster_data['JobLevel'].mean():.1f}")
-                            st.metric("Role Stagnation", f"{cluster_data['RoleStagnationIndex'].mean():.3f}")
-                            st.metric("Attrition Rate", f"{cluster_data['Attrition'].mean()*100:.1f}%")
+                            st.metric("Avg Job Level", f"{cluster_data['JobLevel']:.1f}")
+                            st.metric("Role Stagnation", f"{cluster_data['RoleStagnationIndex']:.3f}")
+                            st.metric("Attrition Rate", f"{cluster_data['Attrition']*100:.1f}%")
         
         # Cluster comparison chart
         st.markdown("#### Cluster Comparison Analysis")
         
-        cluster_comparison = filtered_df.groupby('CareerCluster').agg({
-            'PromotionGapRatio': 'mean',
-            'RoleStagnationIndex': 'mean',
-            'CareerVelocityScore': 'mean',
-            'TrainingIntensityScore': 'mean'
-        }).reset_index()
-        
-        cluster_comparison['ClusterLabel'] = cluster_comparison['CareerCluster'].map(analyzer.cluster_labels)
+        cluster_comparison = aggregates['cluster_comparison']
+        cluster_comparison = cluster_comparison.assign(
+            ClusterLabel=cluster_comparison['CareerCluster'].map(analyzer.cluster_labels))
         
         fig_radar = go.Figure()
         
@@ -254,15 +283,7 @@ def main():
         # Role-level stagnation insights
         st.markdown("#### Role-Level Stagnation Analysis")
         
-        role_stagnation = filtered_df.groupby('JobRole').agg({
-            'PromotionGapRatio': 'mean',
-            'RoleStagnationIndex': 'mean',
-            'YearsSinceLastPromotion': 'mean',
-            'Attrition': 'mean'
-        }).round(3)
-        
-        role_stagnation.columns = ['Avg Promotion Gap', 'Avg Role Stagnation', 'Avg Years Since Promotion', 'Attrition Rate']
-        role_stagnation = role_stagnation.sort_values('Avg Promotion Gap', ascending=False)
+        role_stagnation = aggregates['role_stagnation']
         
         st.dataframe(role_stagnation, use_container_width=True)
         
@@ -271,67 +292,67 @@ def main():
         
         gap_threshold = st.slider("Promotion Gap Ratio Threshold", 0.0, 1.0, 0.4, 0.05)
         
-        above_threshold = filtered_df[filtered_df['PromotionGapRatio'] >= gap_threshold]
-        below_threshold = filtered_df[filtered_df['PromotionGapRatio'] < gap_threshold]
+        # Binary search over the presorted ratios of this selection
+        gap_split = aggregates['gap_threshold'].split(gap_threshold)
         
         col_a, col_b = st.columns(2)
         
         with col_a:
             st.metric(f"Above Threshold (≥{gap_threshold})", 
-                     f"{len(above_threshold)} ({len(above_threshold)/len(filtered_df)*100:.1f}%)")
-            st.metric("Avg Attrition (Above)", f"{above_threshold['Attrition'].mean()*100:.1f}%")
+                     f"{gap_split['above']} ({gap_split['above']/len(filtered_df)*100:.1f}%)")
+            st.metric("Avg Attrition (Above)", f"{gap_split['above_mean']*100:.1f}%")
         
         with col_b:
             st.metric(f"Below Threshold (<{gap_threshold})", 
-                     f"{len(below_threshold)} ({len(below_threshold)/len(filtered_df)*100:.1f}%)")
-            st.metric("Avg Attrition (Below)", f"{below_threshold['Attrition'].mean()*100:.1f}%")
+                     f"{gap_split['below']} ({gap_split['below']/len(filtered_df)*100:.1f}%)")
+            st.metric("Avg Attrition (Below)", f"{gap_split['below_mean']*100:.1f}%")
+        
+        # What-if on the risk level cutoffs, answered from presorted risk scores
+        st.markdown("#### Risk Cutoff What-If")
+        
+        max_score = sum(max(points for _, points in tiers) for _, _, tiers in RISK_SCORING_CRITERIA)
+        col_a, col_b = st.columns(2)
+        with col_a:
+            high_cutoff = st.slider("High risk at score ≥", 1, max_score, RISK_LEVEL_CUTOFFS[0][0])
+        with col_b:
+            medium_cutoff = st.slider("Medium risk at score ≥", 1, max_score, RISK_LEVEL_CUTOFFS[1][0])
+        
+        what_if = aggregates['risk_cutoffs'].bands([(high_cutoff, 'High'), (medium_cutoff, 'Medium')],
+                                                   DEFAULT_RISK_LEVEL)
+        what_if['Share'] = (what_if['Employees'] / len(filtered_df) * 100).round(1)
+        what_if['Attrition Rate'] = (what_if['Mean Outcome'] * 100).round(1)
+        st.dataframe(what_if[['Employees', 'Share', 'Attrition Rate']], use_container_width=True)
     
     with tab3:
         st.markdown("### Retention Opportunity Panel")
         
-        # Get retention opportunities for filtered data
-        retention_candidates = filtered_df[
-            (filtered_df['Attrition'] == 0) & 
-            (filtered_df['PromotionGapRiskLevel'].isin(['Medium', 'High'])) & 
-            (filtered_df['JobSatisfaction'] >= 3) & 
-            (filtered_df['EnvironmentSatisfaction'] >= 3)
-        ].copy()
-        
-        # Calculate retention opportunity index
-        retention_candidates['RetentionOpportunityIndex'] = (
-            retention_candidates['PromotionGapRiskScore'] * 0.4 +
-            (5 - retention_candidates['JobSatisfaction']) * 0.2 +
-            (5 - retention_candidates['EnvironmentSatisfaction']) * 0.2 +
-            retention_candidates['RoleStagnationIndex'] * 10 * 0.2
-        )
-        
-        retention_candidates = retention_candidates.sort_values('RetentionOpportunityIndex', ascending=False)
+        # Retention ranking memoized per selection; only displayed pages get sorted
+        retention_ranking = aggregates['retention_ranking']
         
         col1, col2 = st.columns(2)
         
         with col1:
-            st.metric("Employees Needing Career Intervention", f"{len(retention_candidates)}")
+            st.metric("Employees Needing Career Intervention", f"{len(retention_ranking)}")
             
-            if len(retention_candidates) > 0:
-                high_priority = retention_candidates[retention_candidates['RetentionOpportunityIndex'] >= 5.0]
-                st.metric("High Priority (Index ≥ 5.0)", f"{len(high_priority)}")
+            if len(retention_ranking) > 0:
+                st.metric("High Priority (Index ≥ 5.0)", f"{retention_ranking.count_at_least(5.0)}")
         
         with col2:
-            if len(retention_candidates) > 0:
-                avg_opportunity_index = retention_candidates['RetentionOpportunityIndex'].mean()
+            if len(retention_ranking) > 0:
+                avg_opportunity_index = retention_ranking.mean()
                 st.metric("Avg Opportunity Index", f"{avg_opportunity_index:.2f}")
                 
                 # Suggested actions distribution
-                training_needed = len(retention_candidates[retention_candidates['TrainingIntensityScore'] < 0.2])
-                promotion_review = len(retention_candidates[retention_candidates['PromotionGapRatio'] > 0.5])
-                role_rotation = len(retention_candidates[retention_candidates['RoleStagnationIndex'] > 0.6])
+                training_needed = int(np.count_nonzero(retention_ranking.column('TrainingIntensityScore') < 0.2))
+                promotion_review = int(np.count_nonzero(retention_ranking.column('PromotionGapRatio') > 0.5))
+                role_rotation = int(np.count_nonzero(retention_ranking.column('RoleStagnationIndex') > 0.6))
                 
                 st.markdown("**Suggested Actions:**")
                 st.write(f"• Training Needed: {training_needed} employees")
                 st.write(f"• Promotion Review: {promotion_review} employees")
                 st.write(f"• Role Rotation: {role_rotation} employees")
         
-        if len(retention_candidates) > 0:
+        if len(retention_ranking) > 0:
             # Detailed retention opportunities table
             st.markdown("#### Detailed Retention Opportunities")
             
@@ -339,8 +360,11 @@ def main():
                            'PromotionGapRiskLevel', 'JobSatisfaction', 'EnvironmentSatisfaction',
                            'RetentionOpportunityIndex']
             
-            # Show top 20 opportunities
-            top_opportunities = retention_candidates.head(20)
+            # Show 20 opportunities per page, top page first
+            page_count = (len(retention_ranking) - 1) // 20 + 1
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1,
+                                   help=f"{page_count} pages of 20 employees")
+            top_opportunities = retention_ranking.page(page - 1, 20)
             
             st.dataframe(
                 top_opportunities[display_cols].round(3),
@@ -362,29 +386,35 @@ def main():
                 st.markdown('<div class="insight-box">', unsafe_allow_html=True)
                 st.markdown(f"**Employee {selected_employee} - {employee_data['JobRole']}**")
                 
-                recommendations = []
-                
-                if employee_data['PromotionGapRatio'] > 0.5:
-                    recommendations.append("🎯 **Promotion Review**: Consider for advancement based on tenure and performance")
-                
-                if employee_data['TrainingIntensityScore'] < 0.2:
-                    recommendations.append("📚 **Training Program**: Enroll in skill development programs to enhance capabilities")
-                
-                if employee_data['RoleStagnationIndex'] > 0.6:
-                    recommendations.append("🔄 **Role Rotation**: Consider lateral move to new team or project")
-                
-                if employee_data['ManagerStabilityIndicator'] < 0.3:
-                    recommendations.append("👥 **Manager Assignment**: Review manager-employee fit and consider reassignment")
-                
-                if employee_data['JobSatisfaction'] < 4:
-                    recommendations.append("💬 **Career Discussion**: Schedule career development conversation")
-                
-                for rec in recommendations:
+                # Same rule table the bulk export evaluates
+                employee_flags = evaluate_interventions(top_opportunities.loc[[selected_employee]])[0]
+                for rec in recommendations(employee_flags):
                     st.markdown(f"• {rec}")
                 
                 st.markdown('</div>', unsafe_allow_html=True)
+                
+                # Nearest employees in the clustering feature space, split by attrition
+                peer_index = getattr(analyzer, 'peer_index', None)
+                if peer_index is not None:
+                    position = analyzer.processed_df.index.get_loc(selected_employee)
+                    peer_cols = ['Department', 'JobRole', 'YearsAtCompany', 'YearsSinceLastPromotion',
+                                 'PromotionGapRatio']
+                    col_stayed, col_left = st.columns(2)
+                    for column, group, title in [(col_stayed, 0, "Closest Peers Who Stayed"),
+                                                 (col_left, 1, "Closest Peers Who Left")]:
+                        with column:
+                            st.markdown(f"**{title}**")
+                            if group in peer_index.groups():
+                                distances, positions = peer_index.peers_of(position, k=5, group=group)
+                                peers = analyzer.processed_df.iloc[positions][peer_cols].assign(Distance=distances)
+                                st.dataframe(peers.round(3), use_container_width=True)
         else:
             st.info("No retention opportunities identified in the current filter selection.")
+        
+        # Intervention rules evaluated for every employee in the selection at once
+        st.markdown("#### Intervention Flags (All Filtered Employees)")
+        intervention_summary = aggregates['intervention_counts']
+        st.dataframe(intervention_summary.rename('Employees').to_frame(), use_container_width=True)
     
     with tab4:
         st.markdown("### Managerial Insight Dashboard")
@@ -394,14 +424,7 @@ def main():
         
         with col1:
             # Manager stability impact
-            manager_impact = filtered_df.groupby('YearsWithCurrManager').agg({
-                'PromotionGapRatio': 'mean',
-                'CareerVelocityScore': 'mean',
-                'Attrition': 'mean',
-                'JobSatisfaction': 'mean'
-            }).round(3)
-            
-            manager_impact.columns = ['Avg Promotion Gap', 'Avg Career Velocity', 'Attrition Rate', 'Avg Job Satisfaction']
+            manager_impact = aggregates['manager_impact']
             
             fig_manager = make_subplots(
                 rows=2, cols=2,
@@ -444,24 +467,8 @@ def main():
             # Team-level stagnation signals
             st.markdown("#### Team-Level Stagnation Signals")
             
-            # Create team identifier (Department + JobRole combination)
-            filtered_df['Team'] = filtered_df['Department'] + ' - ' + filtered_df['JobRole']
-            
-            team_analysis = filtered_df.groupby('Team').agg({
-                'PromotionGapRatio': 'mean',
-                'RoleStagnationIndex': 'mean',
-                'Attrition': 'mean',
-                'YearsWithCurrManager': 'mean'
-            }).round(3)
-            
-            team_analysis.columns = ['Avg Promotion Gap', 'Avg Role Stagnation', 'Attrition Rate', 'Avg Manager Tenure']
-            
-            # Identify high-risk teams
-            team_analysis['RiskScore'] = (
-                team_analysis['Avg Promotion Gap'] * 0.4 +
-                team_analysis['Avg Role Stagnation'] * 0.3 +
-                team_analysis['Attrition Rate'] * 0.3
-            )
+            # Teams (Department + JobRole combination) with their RiskScore
+            team_analysis = aggregates['team_analysis']
             
             high_risk_teams = team_analysis.sort_values('RiskScore', ascending=False).head(10)
             
@@ -470,13 +477,7 @@ def main():
             # Manager effectiveness insights
             st.markdown("#### Manager Effectiveness Insights")
             
-            manager_effectiveness = filtered_df.groupby('YearsWithCurrManager').agg({
-                'JobSatisfaction': 'mean',
-                'EnvironmentSatisfaction': 'mean',
-                'PerformanceRating': 'mean'
-            }).round(2)
-            
-            manager_effectiveness.columns = ['Avg Job Satisfaction', 'Avg Environment Satisfaction', 'Avg Performance Rating']
+            manager_effectiveness = aggregates['manager_effectiveness']
             
             # Find optimal manager tenure range
             optimal_satisfaction = manager_effectiveness['Avg Job Satisfaction'].idxmax()
@@ -506,20 +507,20 @@ def main():
     insights = []
     
     # Cluster insights
-    largest_cluster = filtered_df['CareerCluster'].value_counts().index[0]
+    largest_cluster, largest_cluster_size = summary.largest('CareerCluster')
     largest_cluster_label = analyzer.cluster_labels[largest_cluster]
-    insights.append(f"Primary career pattern: '{largest_cluster_label}' ({filtered_df['CareerCluster'].value_counts().iloc[0]} employees)")
+    insights.append(f"Primary career pattern: '{largest_cluster_label}' ({largest_cluster_size} employees)")
     
     # Risk insights
-    high_risk_pct = len(filtered_df[filtered_df['PromotionGapRiskLevel'] == 'High']) / len(filtered_df) * 100
+    high_risk_pct = summary.count('PromotionGapRiskLevel', 'High') / summary.rows * 100
     insights.append(f"{high_risk_pct:.1f}% of employees at high promotion stagnation risk")
     
     # Training insights
-    low_training_pct = len(filtered_df[filtered_df['TrainingIntensityScore'] < 0.1]) / len(filtered_df) * 100
+    low_training_pct = summary.low_training / summary.rows * 100
     insights.append(f"{low_training_pct:.1f}% have very low training intensity")
     
     # Manager stability insights
-    avg_manager_tenure = filtered_df['YearsWithCurrManager'].mean()
+    avg_manager_tenure = summary.mean('YearsWithCurrManager')
     insights.append(f"Average manager-employee relationship: {avg_manager_tenure:.1f} years")
     
     # Display insights
@@ -537,7 +538,7 @@ def main():
     st.markdown("---")
     st.markdown("### 📊 Export Data")
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         if st.button("Export Filtered Data"):
@@ -551,8 +552,8 @@ def main():
     
     with col2:
         if st.button("Export Retention Opportunities"):
-            if len(retention_candidates) > 0:
-                csv = retention_candidates.to_csv(index=False)
+            if len(retention_ranking) > 0:
+                csv = retention_ranking.frame().to_csv(index=False)
                 st.download_button(
                     label="Download CSV",
                     data=csv,
@@ -575,6 +576,22 @@ def main():
                 file_name="cluster_analysis.csv",
                 mime="text/csv"
             )
+    
+    with col4:
+        if st.button("Export Intervention Flags"):
+            buffer = io.StringIO()
+            stream_interventions(chunk_frame(filtered_df), buffer)
+            st.download_button(
+                label="Download CSV",
+                data=buffer.getvalue(),
+                file_name="intervention_flags.csv",
+                mime="text/csv"
+            )
+    
+    # Pipeline instrumentation from the most recent load
+    if analyzer.profiler is not None:
+        with st.expander("⏱️ Pipeline Stage Timings"):
+            st.dataframe(analyzer.profiler.summary().round(3), use_container_width=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Column order of the Palo Alto Networks extract
+WORKFORCE_COLUMNS = [
+    'Age', 'Attrition', 'BusinessTravel', 'DailyRate', 'Department', 'DistanceFromHome', 'Education',
+    'EducationField', 'EnvironmentSatisfaction', 'Gender', 'HourlyRate', 'JobInvolvement', 'JobLevel',
+    'JobRole', 'JobSatisfaction', 'MaritalStatus', 'MonthlyIncome', 'MonthlyRate', 'NumCompaniesWorked',
+    'OverTime', 'PercentSalaryHike', 'PerformanceRating', 'RelationshipSatisfaction', 'StockOptionLevel',
+    'TotalWorkingYears', 'TrainingTimesLastYear', 'WorkLifeBalance', 'YearsAtCompany', 'YearsInCurrentRole',
+    'YearsSinceLastPromotion', 'YearsWithCurrManager'
+]
+
+# Category values and approximate shares observed in the real extract
+DEPARTMENTS = {'Research & Development': 0.65, 'Sales': 0.30, 'Human Resources': 0.05}
+JOB_ROLES = {
+    'Research & Development': ['Research Scientist', 'Laboratory Technician', 'Manufacturing Director',
+                               'Healthcare Representative', 'Research Director', 'Manager'],
+    'Sales': ['Sales Executive', 'Sales Representative', 'Manager'],
+    'Human Resources': ['Human Resources', 'Manager'],
+}
+EDUCATION_FIELDS = {'Life Sciences': 0.41, 'Medical': 0.32, 'Marketing': 0.11, 'Technical Degree': 0.09,
+                    'Other': 0.05, 'Human Resources': 0.02}
+BUSINESS_TRAVEL = {'Travel_Rarely': 0.71, 'Travel_Frequently': 0.19, 'Non-Travel': 0.10}
+MARITAL_STATUS = {'Married': 0.46, 'Single': 0.32, 'Divorced': 0.22}
+
+def _choice(rng, shares, size):
+    """Sample category labels with the given shares"""
+    labels = np.array(list(shares), dtype=object)
+    weights = np.array(list(shares.values()), dtype=np.float64)
+    return labels[rng.choice(len(labels), size=size, p=weights / weights.sum())]
+
+def _extend_categories(base, cardinality, prefix):
+    """Pad a category table with synthetic values up to the requested cardinality"""
+    shares = dict(base)
+    for i in range(len(shares), cardinality or 0):
+        shares[f'{prefix} {i + 1}'] = min(shares.values())
+    return shares
+
+def generate_workforce(n_employees, seed=42, n_departments=None, n_roles_per_department=None):
+    """Generate a synthetic workforce with the same 31-column schema as the real extract
+
+    Career fields are drawn so the tenure invariants of real HR data hold
+    (role, promotion and manager tenure never exceed company tenure, which
+    never exceeds working years). n_departments and n_roles_per_department
+    raise the category cardinalities beyond the real extract.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_employees
+
+    departments = _extend_categories(DEPARTMENTS, n_departments, 'Department')
+    department = _choice(rng, departments, n)
+
+    # Roles are drawn per department so role and department stay consistent
+    job_role = np.empty(n, dtype=object)
+    for dept in departments:
+        members = np.flatnonzero(department == dept)
+        roles = list(JOB_ROLES.get(dept, ['Manager']))
+        while n_roles_per_department and len(roles) < n_roles_per_department:
+            roles.append(f'{dept} Role {len(roles) + 1}')
+        job_role[members] = np.array(roles, dtype=object)[rng.integers(0, len(roles), size=len(members))]
+
+    age = np.clip(rng.normal(37, 9, n).round(), 18, 60).astype(np.int64)
+    total_working_years = np.minimum(rng.gamma(2.5, 4.5, n).round(), age - 18).astype(np.int64)
+    years_at_company = np.floor(total_working_years * rng.beta(2.5, 1.5, n)).astype(np.int64)
+    years_in_current_role = np.floor(years_at_company * rng.beta(2.0, 1.2, n)).astype(np.int64)
+    years_since_last_promotion = np.floor(years_at_company * rng.beta(1.0, 2.2, n)).astype(np.int64)
+    years_with_curr_manager = np.floor(years_at_company * rng.beta(2.0, 1.2, n)).astype(np.int64)
+
+    job_level = np.clip((total_working_years / 7 + rng.normal(0.7, 0.7, n)).round(), 1, 5).astype(np.int64)
+    monthly_income = np.clip(job_level * 3000 + rng.normal(0, 1500, n), 1009, 19999).round().astype(np.int64)
+
+    job_satisfaction = rng.integers(1, 5, n)
+    environment_satisfaction = rng.integers(1, 5, n)
+    overtime = np.where(rng.random(n) < 0.28, 'Yes', 'No').astype(object)
+
+    # Attrition leans on dissatisfaction, overtime and short tenure, about 16% overall
+    logit = (-1.9 + 0.35 * (2.5 - job_satisfaction) + 0.3 * (2.5 - environment_satisfaction)
+             + 1.1 * (overtime == 'Yes') - 0.06 * years_at_company)
+    attrition = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(np.int64)
+
+    columns = {
+        'Age': age,
+        'Attrition': attrition,
+        'BusinessTravel': _choice(rng, BUSINESS_TRAVEL, n),
+        'DailyRate': rng.integers(102, 1500, n),
+        'Department': department,
+        'DistanceFromHome': rng.integers(1, 30, n),
+        'Education': rng.integers(1, 6, n),
+        'EducationField': _choice(rng, EDUCATION_FIELDS, n),
+        'EnvironmentSatisfaction': environment_satisfaction,
+        'Gender': np.where(rng.random(n) < 0.6, 'Male', 'Female').astype(object),
+        'HourlyRate': rng.integers(30, 101, n),
+        'JobInvolvement': rng.integers(1, 5, n),
+        'JobLevel': job_level,
+        'JobRole': job_role,
+        'JobSatisfaction': job_satisfaction,
+        'MaritalStatus': _choice(rng, MARITAL_STATUS, n),
+        'MonthlyIncome': monthly_income,
+        'MonthlyRate': rng.integers(2094, 27000, n),
+        'NumCompaniesWorked': rng.integers(0, 10, n),
+        'OverTime': overtime,
+        'PercentSalaryHike': rng.integers(11, 26, n),
+        'PerformanceRating': np.where(rng.random(n) < 0.85, 3, 4),
+        'RelationshipSatisfaction': rng.integers(1, 5, n),
+        'StockOptionLevel': rng.integers(0, 4, n),
+        'TotalWorkingYears': total_working_years,
+        'TrainingTimesLastYear': rng.integers(0, 7, n),
+        'WorkLifeBalance': rng.integers(1, 5, n),
+        'YearsAtCompany': years_at_company,
+        'YearsInCurrentRole': years_in_current_role,
+        'YearsSinceLastPromotion': years_since_last_promotion,
+        'YearsWithCurrManager': years_with_curr_manager,
+    }
+    return pd.DataFrame(columns, columns=WORKFORCE_COLUMNS)
+
+def write_workforce_csv(path, n_employees, seed=42, chunk_size=1_000_000, **kwargs):
+    """Write a synthetic workforce CSV in chunks so large sizes fit in memory"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    written = 0
+    chunk_index = 0
+    with open(path, 'w', newline='') as f:
+        while written < n_employees:
+            size = min(chunk_size, n_employees - written)
+            # Each chunk derives its own seed so a given (seed, chunk_size) is reproducible
+            chunk = generate_workforce(size, seed=(seed, chunk_index), **kwargs)
+            chunk.to_csv(f, index=False, header=(chunk_index == 0))
+            written += size
+            chunk_index += 1
+    return path
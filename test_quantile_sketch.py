@@ -0,0 +1,30 @@
+import numpy as np
+from quantile_sketch import QuantileSketch
+
+def _merged(values, chunks):
+    sketch = QuantileSketch(capacity=256)
+    for chunk in np.array_split(values, chunks):
+        sketch.merge(QuantileSketch(capacity=256).update(chunk))
+    return sketch
+
+def test_rank_error_bounds_quantiles_without_growing_per_merge():
+    values = np.random.default_rng(0).lognormal(0, 2, 100_000)
+    ordered = np.sort(values)
+    levels = np.linspace(0, 1, 101)
+    errors = []
+    for chunks in [10, 100, 400]:
+        sketch = _merged(values, chunks)
+        estimates = sketch.quantile(levels)
+        # Rank range each estimate actually occupies in the full column
+        low = np.searchsorted(ordered, estimates, side='left') / len(values)
+        high = np.searchsorted(ordered, estimates, side='right') / len(values)
+        assert np.all(levels >= low - sketch.rank_error)
+        assert np.all(levels <= high + sketch.rank_error)
+        errors.append(sketch.rank_error)
+    # Adding a compaction term per merge reported 10x more at 400 chunks than at 10
+    assert errors[-1] < 4 * errors[0]
+
+def test_distinct_values_stay_exact():
+    sketch = _merged(np.tile(np.arange(50.0), 1000), 40)
+    assert sketch.exact
+    assert sketch.rank_error == 0.0
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+from snapshot_store import SnapshotStore
+
+def _extract(departments, incomes):
+    return pd.DataFrame({'EmployeeNumber': np.arange(1, len(departments) + 1), 'Department': departments,
+                         'MonthlyIncome': incomes})
+
+def test_filter_on_value_added_by_later_append(tmp_path):
+    store = SnapshotStore(str(tmp_path), id_column='EmployeeNumber')
+    store.append(_extract(['Sales', 'Sales', 'R&D'], [100, 200, 300]), '2024-01', derived=False)
+    # Builds the Department lookup before 'Marketing' exists
+    store.cohort_metric('MonthlyIncome', where=[('Department', '==', 'Sales')])
+
+    store.append(_extract(['Sales', 'Marketing', 'Marketing'], [100, 400, 500]), '2024-02', derived=False)
+    where = [('Department', '==', 'Marketing')]
+    result = store.cohort_metric('MonthlyIncome', where=where)
+    assert result.loc['2024-02', 'employees'] == 2
+    assert result.loc['2024-02', 'value'] == 450
+    assert result.equals(SnapshotStore(str(tmp_path)).cohort_metric('MonthlyIncome', where=where))
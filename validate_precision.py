@@ -0,0 +1,84 @@
+import argparse
+import contextlib
+import io
+import sys
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from sklearn.metrics import adjusted_rand_score
+from career_progression_analysis import CareerProgressionAnalyzer
+
+# Largest share of employees allowed to change cluster or risk level in compact mode
+CLUSTER_TOLERANCE = 0.01
+RISK_LEVEL_TOLERANCE = 0.001
+
+def run_pipeline(data_path, compact, n_clusters=3, method='kmeans', typed=False):
+    """Run the stages that decide cluster and risk level in one precision"""
+    analyzer = CareerProgressionAnalyzer(data_path, compact=compact)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer.load_data(typed=typed)
+        analyzer.feature_engineering()
+        analyzer.preprocess_data()
+        analyzer.perform_clustering(n_clusters, method=method, silhouette_method='sampled')
+        analyzer.calculate_promotion_gap_risk_score()
+    return analyzer
+
+def match_clusters(reference, candidate, n_clusters):
+    """Relabel candidate clusters to the reference ids they overlap most"""
+    overlap = np.zeros((n_clusters, n_clusters), dtype=np.int64)
+    np.add.at(overlap, (reference, candidate), 1)
+    ref_ids, cand_ids = linear_sum_assignment(-overlap)
+    mapping = np.empty(n_clusters, dtype=np.int64)
+    mapping[cand_ids] = ref_ids
+    return mapping[candidate]
+
+def compare_precision(reference, candidate, n_clusters):
+    """Agreement and memory figures for a compact run against the float64 reference"""
+    ref_clusters = np.asarray(reference.clusters)
+    cand_clusters = match_clusters(ref_clusters, np.asarray(candidate.clusters), n_clusters)
+    ref_df, cand_df = reference.processed_df, candidate.processed_df
+
+    return {
+        'employees': len(ref_df),
+        'cluster_agreement': float(np.mean(ref_clusters == cand_clusters)),
+        'adjusted_rand_index': float(adjusted_rand_score(ref_clusters, cand_clusters)),
+        'risk_level_agreement': float(np.mean(
+            ref_df['PromotionGapRiskLevel'].to_numpy() == cand_df['PromotionGapRiskLevel'].to_numpy())),
+        'risk_score_max_abs_diff': int(np.abs(
+            ref_df['PromotionGapRiskScore'].to_numpy() - cand_df['PromotionGapRiskScore'].to_numpy()).max()),
+        'x_scaled_max_abs_diff': float(np.abs(reference.X_scaled - candidate.X_scaled).max()),
+        'x_scaled_mb': reference.X_scaled.nbytes / 1024 ** 2,
+        'x_scaled_compact_mb': candidate.X_scaled.nbytes / 1024 ** 2,
+        'frame_mb': ref_df.memory_usage(deep=True).sum() / 1024 ** 2,
+        'frame_compact_mb': cand_df.memory_usage(deep=True).sum() / 1024 ** 2,
+    }
+
+def validate_compact_mode(data_path, n_clusters=3, method='kmeans', typed=False,
+                          cluster_tolerance=CLUSTER_TOLERANCE, risk_tolerance=RISK_LEVEL_TOLERANCE):
+    """Run both precisions and check compact results stay within tolerance"""
+    reference = run_pipeline(data_path, False, n_clusters, method, typed)
+    candidate = run_pipeline(data_path, True, n_clusters, method, typed)
+    report = compare_precision(reference, candidate, n_clusters)
+    report['cluster_tolerance'] = cluster_tolerance
+    report['risk_level_tolerance'] = risk_tolerance
+    report['passed'] = bool(report['cluster_agreement'] >= 1 - cluster_tolerance
+                            and report['risk_level_agreement'] >= 1 - risk_tolerance)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check compact (float32) mode against the float64 pipeline")
+    parser.add_argument('data_path')
+    parser.add_argument('--clusters', type=int, default=3)
+    parser.add_argument('--clustering', choices=['kmeans', 'minibatch'], default='kmeans')
+    parser.add_argument('--typed', action='store_true', help="Use schema-typed chunked ingestion")
+    parser.add_argument('--cluster-tolerance', type=float, default=CLUSTER_TOLERANCE)
+    parser.add_argument('--risk-tolerance', type=float, default=RISK_LEVEL_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = validate_compact_mode(args.data_path, args.clusters, args.clustering, args.typed,
+                                   args.cluster_tolerance, args.risk_tolerance)
+    for key, value in report.items():
+        print(f"{key:<26}{value}")
+    return 0 if report['passed'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())